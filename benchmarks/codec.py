@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+
+"""
+Compare the installed json libraries on representative RTM frames.
+
+Usage:
+  python benchmarks/codec.py [<iterations>]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from slouch.codec import available_codecs  # noqa
+
+# A command addressed to the bot, as received over RTM.
+INBOUND_MESSAGE = (
+    '{"type": "message", "channel": "C2147483705", "user": "U2147483697",'
+    ' "text": "timerbot: stop --name=deploy --notify=simon", "ts": "1355517523.000005",'
+    ' "source_team": "T061EG9R6", "team": "T061EG9R6", "event_ts": "1355517523.000005",'
+    ' "client_msg_id": "b5d3c3e2-2c8f-4f3e-9d3b-4f0c2a1e7c11",'
+    ' "blocks": [{"type": "rich_text", "block_id": "Qx1", "elements": [{"type": "rich_text_section",'
+    ' "elements": [{"type": "text", "text": "timerbot: stop --name=deploy --notify=simon"}]}]}]}'
+)
+
+# The same frame as utf-8 bytes, which codecs decode without an intermediate str.
+INBOUND_MESSAGE_BYTES = INBOUND_MESSAGE.encode('utf-8')
+
+# A presence change, which makes up much of the traffic on busy workspaces.
+INBOUND_PRESENCE = '{"type": "presence_change", "user": "U2147483697", "presence": "away"}'
+
+OUTBOUND_MESSAGE = {
+    'id': 1234,
+    'type': 'message',
+    'channel': 'C2147483705',
+    'text': '<@U2147483697>: 2 days, 3:04:05\n' * 20,
+}
+
+
+def main(iterations):
+    print('%-10s %14s %14s %14s %14s' % ('codec', 'loads message', 'loads bytes', 'loads presence', 'dumps message'))
+    for codec in available_codecs():
+        timings = [
+            timeit.timeit(lambda: codec.loads(INBOUND_MESSAGE), number=iterations),
+            timeit.timeit(lambda: codec.loads(INBOUND_MESSAGE_BYTES), number=iterations),
+            timeit.timeit(lambda: codec.loads(INBOUND_PRESENCE), number=iterations),
+            timeit.timeit(lambda: codec.dumps(OUTBOUND_MESSAGE), number=iterations),
+        ]
+        print('%-10s %12.2fus %12.2fus %12.2fus %12.2fus' % ((codec.name,) + tuple(t / iterations * 1e6 for t in timings)))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -75,12 +75,11 @@ def stop(opts, bot, event):
     if slack_username:
         mention = ''
 
-        # The slack api (provided by https://github.com/os/slacker) is available on all bots.
-        users = bot.slack.users.list().body['members']
-        for user in users:
-            if user['name'] == slack_username:
-                mention = "<@%s>" % user['id']
-                break
+        # Users, channels and IMs are cached on all bots.
+        # The full slack api (provided by https://github.com/os/slacker) is available as bot.slack.
+        user = bot.directory.user_by_name(slack_username)
+        if user is not None:
+            mention = "<@%s>" % user.id
         response = "%s: %s" % (mention, response)
 
     return response
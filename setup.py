@@ -9,7 +9,7 @@ requires = [
     'docopt-unicode == 0.6.1',  # https://github.com/docopt/docopt/pull/220
     'mock',
     'requests',
-    'slacker >= 0.5.1',
+    'slacker >= 0.14.0',
     'websocket-client',
 ]
 
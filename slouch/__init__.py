@@ -1,10 +1,12 @@
+import collections
 import functools
 import inspect
-import json
 import logging
-import pprint
 import sys
+import threading
+import time
 import traceback
+from wsgiref.simple_server import make_server
 
 from docopt import docopt, DocoptExit
 from slacker import Slacker
@@ -12,11 +14,33 @@ import websocket
 
 from . import testing  # noqa
 from ._version import __version__  # noqa
+from .codec import default_codec
+from .directory import Directory
+from .event import Event
+from .keepalive import Keepalive
+from .lease import FileLease, Lease  # noqa
+from .logs import lazy_pformat, log_record
+from .events_api import EventsApp
+from .scheduler import Scheduler
+from .snapshot import apply_snapshot, load_snapshot, save_snapshot
+from .stats import Stats
+from .webapi import WebApi
+from .writer import RtmWriter
 
 # Message server will reject a message longer than 16kbs 
 # or 4000 characters. See https://api.slack.com/rtm#limits
 SLACK_MESSAGE_LIMIT = 4000
 
+# How much of an uploaded response to show inline.
+SNIPPET_SUMMARY_LENGTH = 200
+
+# The dict response fields a snippet can carry; responses with any others
+# (eg attachments) are split into messages instead so nothing is dropped.
+SNIPPET_FIELDS = frozenset(['text', 'channel', 'thread_ts'])
+
+#: the hooks a middleware may define, in the order they run.
+MIDDLEWARE_STAGES = ('pre_parse', 'pre_dispatch', 'post_response', 'on_error')
+
 def _dual_decorator(func):
     """This is a decorator that converts a paramaterized decorator for
     no-param use.
@@ -52,16 +76,24 @@ def help(opts, bot, _):
     return bot.commands[command].__doc__
 
 
+def _acknowledge(bot, event):
+    # A scheduler job, so pending acks are cheap to cancel.
+    bot._acknowledge(event)
+
+
 class _CommandMeta(type):
     """
     If the commands dict is a class field on Bot, then all subclasses will share one registry.
 
     This metaclass initializes a separate registry on each class.
+    The same goes for middleware.
     """
 
     def __new__(cls, name, bases, dct):
         new_cls = super(_CommandMeta, cls).__new__(cls, name, bases, dct)
         new_cls.commands = {}
+        new_cls.middlewares = []
+        new_cls._middleware_hooks = dict((stage, ()) for stage in MIDDLEWARE_STAGES)
 
         return new_cls
 
@@ -78,6 +110,67 @@ class Bot(object):
 
     __metaclass__ = _CommandMeta
 
+    #: a file to persist jobs scheduled with ``persist=True`` to, so they survive restarts.
+    #: Override on a subclass to enable persistence.
+    schedule_path = None
+
+    #: the :class:`~slouch.codec.JsonCodec` used for RTM frames and Events API bodies.
+    #: Defaults to the fastest installed json library; see :func:`slouch.codec.get_codec` to pick one.
+    codec = default_codec()
+
+    #: responses with more characters than this are uploaded as a single snippet
+    #: (with a short summary message) instead of being split into many messages.
+    #: Dict responses are only uploaded if they have no fields besides
+    #: ``text``, ``channel`` and ``thread_ts``. None (the default) always splits.
+    snippet_threshold = None
+
+    #: seconds between RTM pings, or None to disable them.
+    #: Round trip times are recorded in :attr:`stats` as ``rtm.ack.ping``.
+    ping_interval = 30
+
+    #: seconds to wait for a pong before reconnecting.
+    ping_timeout = 10
+
+    #: seconds a ping round trip may take before it counts as degraded, or None.
+    #: After three degraded round trips in a row, the bot reconnects.
+    max_ping_rtt = None
+
+    #: a file to cache workspace metadata (the bot's identity and its :attr:`directory`) in.
+    #: When it exists, connecting uses the cache and the lighter rtm.connect instead of rtm.start,
+    #: and the cache is refreshed from the Web API in the background.
+    #: The cache is only read on the first connection; reconnects keep the live directory
+    #: and reconcile it in the background.
+    #: None (the default) disables the cache.
+    snapshot_path = None
+
+    #: the most Web API connections :attr:`api` keeps open.
+    api_pool_size = 10
+
+    #: the number of threads :attr:`api` uses for concurrent calls.
+    api_concurrency = 4
+
+    #: how many times :attr:`api` retries a rate limited or failed call.
+    api_max_retries = 3
+
+    #: the fraction of per-message debug records to emit.
+    #: Lower this to keep debug logging affordable on busy workspaces.
+    debug_sample_rate = 1.0
+
+    #: seconds between attempts to take or renew the lease passed to :func:`run_forever`;
+    #: a standby takes over within this long of the active instance's lease lapsing.
+    lease_interval = 0.2
+
+    #: seconds a command may run before the user is shown it's being worked on:
+    #: a typing indicator, or :attr:`ack_text` if that's set. None disables this.
+    ack_after = 1.0
+
+    #: a message to send instead of a typing indicator when a command outlasts :attr:`ack_after`.
+    ack_text = None
+
+    #: seconds to remember finished commands, to catch duplicates that were sent while
+    #: they ran but only read afterwards (RTM messages are read one at a time).
+    request_memory = 60
+
     @classmethod
     @_dual_decorator
     def command(cls, name=None):
@@ -91,7 +184,8 @@ class Bot(object):
 
           * opts: a dictionary output by docopt
           * bot: the Bot instance handling the command (eg for storing state between commands)
-          * event: the Slack event that triggered the command (eg for finding the message's sender)
+          * event: the Slack :class:`Event` that triggered the command (eg for finding the message's sender).
+            It can be used like a dict of the event's fields.
 
         Additional options may be passed in as keyword arguments:
 
@@ -128,6 +222,52 @@ class Bot(object):
             return _cmd_wrapper
         return decorator
 
+    @classmethod
+    def middleware(cls, middleware):
+        """
+        Register a middleware around command dispatch. Middleware run in registration order.
+
+        A middleware is any object (or class, which will be instantiated with no arguments)
+        defining some of these methods:
+
+          * ``pre_parse(bot, event)``: called for each message before looking for a command.
+            Return False to ignore the message.
+          * ``pre_dispatch(bot, event, cmd, rest)``: called before running a command.
+            Return anything other than None to use it as the response instead of running the command.
+          * ``post_response(bot, event, res)``: called with every response before it is sent.
+            Must return the response to send (or None to send nothing).
+          * ``on_error(bot, event, exc)``: called when a command raises.
+            Return anything other than None to use it as the response instead of the traceback.
+
+        Hooks are collected into flat per-stage sequences when the middleware is registered,
+        so dispatch does no lookups. Time spent in each hook is recorded in :attr:`stats`
+        as ``middleware.<name>.<stage>``, where name is the middleware's `name` attribute
+        or its class name.
+
+        This can be used as a class decorator.
+        """
+        instance = middleware() if inspect.isclass(middleware) else middleware
+
+        cls.middlewares.append(instance)
+        name = getattr(instance, 'name', type(instance).__name__)
+
+        for stage in MIDDLEWARE_STAGES:
+            hook = getattr(instance, stage, None)
+            if hook is not None:
+                key = 'middleware.%s.%s' % (name, stage)
+                cls._middleware_hooks[stage] += ((key, hook),)
+
+        return middleware
+
+    def _run_hooks(self, stage, *args):
+        """Yield the result of each hook registered for a stage, recording its duration."""
+        for key, hook in self._middleware_hooks[stage]:
+            start = time.time()
+            try:
+                yield hook(self, *args)
+            finally:
+                self.stats.record(key, time.time() - start)
+
     @classmethod
     def help_text(cls):
         """Return a slack-formatted list of commands with their usage."""
@@ -153,14 +293,30 @@ class Bot(object):
         """
         #: the same config dictionary passed to init.
         self.config = config
-        self._current_message_id = 0
 
         #: a Logger (``logging.getLogger(__name__)``).
         self.log = logging.getLogger(__name__)
 
-        # This doesn't perform IO.
+        #: a :class:`Stats` recording command, middleware, websocket and Web API timings.
+        self.stats = Stats()
+
+        # These don't perform IO.
+        #: a pooled, retrying :class:`WebApi` client created with `slack_token`.
+        #: Use its :func:`~WebApi.call_many` to make several calls concurrently.
+        self.api = WebApi(slack_token, self.stats, pool_size=self.api_pool_size,
+                          concurrency=self.api_concurrency, max_retries=self.api_max_retries)
+
         #: a `Slacker <https://github.com/os/slacker>`__ instance created with `slack_token`.
-        self.slack = Slacker(slack_token)
+        #: It shares :attr:`api`'s connection pool.
+        self.slack = Slacker(slack_token, session=self.api.session,
+                             rate_limit_retries=self.api_max_retries)
+
+        #: the :class:`Scheduler` used by :func:`schedule_at` and :func:`every`.
+        self.scheduler = Scheduler(self, self.schedule_path)
+
+        #: a :class:`Directory` of the workspace's users, channels and IMs.
+        #: Each kind is loaded on first lookup and kept current from RTM events.
+        self.directory = Directory(self)
 
         #: the bot's Slack id.
         #: Not available until :func:`prepare_connection`.
@@ -178,6 +334,27 @@ class Bot(object):
         #: Not available until :func:`prepare_connection`.
         self.ws = None
 
+        # Own sending on and monitoring ws; replaced on each connection.
+        self._writer = None
+        self._keepalive = None
+
+        # Set by _on_close, so run_forever knows to reconnect.
+        self._disconnected = False
+
+        #: False while this instance is a standby; see :func:`run_forever`.
+        self.active = True
+
+        #: the :class:`~slouch.lease.Lease` passed to :func:`run_forever`, if any.
+        self.lease = None
+        self._lease_thread = None
+        self._lease_stop = threading.Event()
+
+        # Requests are (user, channel, command text). Finished ones map to when they finished,
+        # locally and on Slack's clock, oldest first.
+        self._in_flight = set()
+        self._finished = collections.OrderedDict()
+        self._requests_lock = threading.Lock()
+
         self.prepare_bot(self.config)
 
     def prepare_bot(self, config):
@@ -196,15 +373,73 @@ class Bot(object):
         """
         pass
 
-    def run_forever(self):
-        """Run the bot, blocking forever."""
-        res = self.slack.rtm.start()
-        self.log.info("current channels: %s",
-                      ','.join(c['name'] for c in res.body['channels']
-                               if c['is_member']))
-        self.id = res.body['self']['id']
-        self.name = res.body['self']['name']
-        self.my_mention = "<@%s>" % self.id
+    def on_send_failed(self, frame, error):
+        """
+        Override to handle RTM messages that could not be delivered,
+        eg to retry them with :func:`_send_api_message`.
+
+        This is called from the websocket threads, with the frame that failed
+        and either the exception raised while sending or the error Slack replied with.
+        The count of failures is also recorded in :attr:`stats` as ``rtm.send.failed``.
+        """
+        self.log.warning("failed to deliver rtm frame %r: %s", frame, error)
+
+    def run_forever(self, lease=None):
+        """Run the bot, blocking forever.
+
+        :param lease: a :class:`~slouch.lease.Lease` shared by every instance of this bot,
+          to run them as hot standbys. Each instance connects and keeps its caches current,
+          but only the one holding the lease (see :attr:`active`) handles commands and runs
+          scheduled jobs, and only it writes :attr:`schedule_path`; a standby reloads the schedule
+          when it takes over. When its lease lapses, a standby takes over within :attr:`lease_interval`.
+          None (the default) means this instance is always active.
+        """
+        if lease is not None:
+            # Stay passive until the lease is ours.
+            self.active = False
+
+        reconnect = False
+        while True:
+            self._connect(reconnect)
+            if lease is not None and self._lease_thread is None:
+                self._hold_lease(lease)
+
+            self._disconnected = False
+            self.ws.run_forever()
+            if not self._disconnected:
+                # Returned without the connection closing, eg when interrupted.
+                return
+
+            # Reconnect from this loop rather than from _on_close, so reconnects don't grow the stack.
+            # Each connection gets a new writer: slack just requires ids that are unique per session.
+            reconnect = True
+
+    def _connect(self, reconnect):
+        """Start an RTM session and set up its websocket, without running it.
+
+        :param reconnect: True if this replaces a connection that closed.
+        """
+        snapshot = None if reconnect else self._load_snapshot()
+        if snapshot is not None:
+            # The snapshot stands in for rtm.start's workspace data; rtm.connect just provides the url.
+            res = self.slack.rtm.get('rtm.connect')
+            apply_snapshot(snapshot, self)
+        elif reconnect and self.snapshot_path is not None:
+            # Events have kept the directory newer than the snapshot on disk; keep it,
+            # and reconcile it below for any events missed while disconnected.
+            res = self.slack.rtm.get('rtm.connect')
+        else:
+            res = self.slack.rtm.start()
+            self.log.info("current channels: %s",
+                          ','.join(c['name'] for c in res.body['channels']
+                                   if c['is_member']))
+            for kind in ('users', 'channels', 'ims'):
+                if kind in res.body:
+                    self.directory.seed(kind, res.body[kind])
+
+        self._set_identity(res.body['self']['id'], res.body['self']['name'])
+        self._start_scheduler()
+        self._refresh_snapshot(reconcile=reconnect or snapshot is not None)
 
         self.ws = websocket.WebSocketApp(
             res.body['url'],
@@ -212,17 +447,173 @@ class Bot(object):
             on_error=self._on_error,
             on_close=self._on_close,
             on_open=self._on_open)
+        self._writer = RtmWriter(self.ws, self.codec, self.stats, self.on_send_failed)
+        if self.ping_interval:
+            self._keepalive = Keepalive(self._writer, self.stats, self._reconnect,
+                                        self.ping_interval, self.ping_timeout, self.max_ping_rtt)
+        self.prepare_connection(self.config)
+
+    def release_lease(self):
+        """Give up the lease passed to :func:`run_forever` so a standby takes over, eg before a deploy.
+
+        This instance stays connected as a standby, but won't take the lease back.
+        """
+        if self.lease is None:
+            return
+
+        self._lease_stop.set()
+        if self._lease_thread is not None:
+            self._lease_thread.join()
+        self.active = False
+        self.lease.release()
+
+    def _hold_lease(self, lease):
+        self.lease = lease
+        self._lease_thread = threading.Thread(target=self._keep_lease, name='slouch-lease')
+        self._lease_thread.daemon = True
+        self._lease_thread.start()
+
+    def _keep_lease(self):
+        while not self._lease_stop.is_set():
+            try:
+                held = self.lease.acquire()
+            except Exception as e:
+                self.log.exception("%s while acquiring lease", e)
+                held = False
+
+            if held and not self.active:
+                self.log.info("acquired lease; now active")
+                self.stats.incr('lease.acquired')
+                if self.schedule_path is not None:
+                    # Pick up jobs persisted by the previous active instance.
+                    self.scheduler.reload()
+            elif self.active and not held:
+                self.log.warning("lost lease; now a standby")
+                self.stats.incr('lease.lost')
+            self.active = held
+
+            self._lease_stop.wait(self.lease_interval)
+
+    def events_app(self, signing_secret, workers=4):
+        """Return a WSGI application serving the
+        `Events API <https://api.slack.com/events-api>`__ for this bot.
+
+        Use this instead of :func:`run_forever` to run several instances behind a load balancer.
+        The app can be mounted in any WSGI server; :func:`serve_events` runs it standalone.
+        Call :func:`prepare_events` before handling requests.
+
+        Events are acknowledged immediately and handled on `workers` threads,
+        so commands may run concurrently.
+        String responses are sent with chat.postMessage, since there is no RTM connection.
+
+        :param signing_secret: the app's signing secret, used to verify requests.
+        :param workers: the number of threads handling events.
+        """
+        return EventsApp(self, signing_secret, workers)
+
+    def prepare_events(self):
+        """Look up the bot's identity and call :func:`prepare_connection`.
+
+        This is the Events API equivalent of the setup done by :func:`run_forever`.
+        """
+        snapshot = self._load_snapshot()
+        if snapshot is not None:
+            apply_snapshot(snapshot, self)
+            self._set_identity(snapshot['self']['id'], snapshot['self']['name'])
+        else:
+            res = self.slack.auth.test()
+            self._set_identity(res.body['user_id'], res.body['user'])
+
+        self._start_scheduler()
+        self._refresh_snapshot(reconcile=True)
         self.prepare_connection(self.config)
-        self.ws.run_forever()
+
+    def serve_events(self, signing_secret, host='', port=3000, workers=4):
+        """Serve the Events API over HTTP, blocking forever.
+
+        :param signing_secret: the app's signing secret.
+        :param host: the interface to listen on.
+        :param port: the port to listen on.
+        :param workers: the number of threads handling events.
+        """
+        self.prepare_events()
+        server = make_server(host, port, self.events_app(signing_secret, workers))
+        self.log.info("serving events api on %s:%s", host, port)
+        server.serve_forever()
+
+    def schedule_at(self, when, func, args=(), channel=None, persist=False, key=None):
+        """Call ``func(bot, *args)`` once at a given time, from the scheduler thread.
+
+        Like a command, `func` may return a response; it is sent to `channel` if one is given.
+
+        :param when: a naive local datetime or a unix timestamp.
+        :param func: the function to call.
+        :param args: extra positional arguments for `func`.
+        :param channel: a slack channel id to send the response to.
+        :param persist: save the job to :attr:`schedule_path` so it survives restarts.
+          `func` must be a module-level function and `args` must be json-serializable.
+        :param key: a name for the job. Scheduling a job with the same key replaces this one,
+          including when this one was restored from :attr:`schedule_path`; use one for persisted
+          jobs scheduled at startup (eg in :func:`prepare_bot`) so restarts don't add copies.
+        :returns: a :class:`Job`, which can be cancelled.
+        """
+        return self.scheduler.add(when, func, args, channel, persist=persist, key=key)
+
+    def every(self, interval, func, args=(), channel=None, persist=False, start=None, key=None):
+        """Call ``func(bot, *args)`` every `interval` seconds, from the scheduler thread.
+
+        :param interval: the number of seconds between calls.
+        :param start: when to make the first call (defaults to one interval from now).
+          See :func:`schedule_at` for the other arguments.
+        :returns: a :class:`Job`, which can be cancelled.
+        """
+        if start is None:
+            start = time.time() + interval
+        return self.scheduler.add(start, func, args, channel, interval=interval, persist=persist, key=key)
+
+    def _start_scheduler(self):
+        if self.schedule_path is not None:
+            # Runs persisted jobs even if nothing new gets scheduled.
+            self.scheduler.start()
+
+    def _load_snapshot(self):
+        if self.snapshot_path is None:
+            return None
+        return load_snapshot(self.snapshot_path)
+
+    def _refresh_snapshot(self, reconcile):
+        """Write :attr:`snapshot_path` in the background, if it's set.
+
+        :param reconcile: reload the directory from the Web API first.
+        """
+        if self.snapshot_path is None:
+            return
+
+        def refresh():
+            try:
+                if reconcile:
+                    self.directory.load()
+                save_snapshot(self.snapshot_path, self)
+            except Exception as e:
+                self.log.exception("%s while refreshing snapshot", e)
+
+        thread = threading.Thread(target=refresh, name='slouch-snapshot')
+        thread.daemon = True
+        thread.start()
+
+    def _set_identity(self, bot_id, name):
+        self.id = bot_id
+        self.name = name
+        self.my_mention = "<@%s>" % self.id
 
     def _bot_identifier(self, message):
         """Return the identifier used to address this bot in this message.
         If one is not found, return None.
 
-        :param message: a message dict from the slack api.
+        :param message: a message :class:`Event`.
         """
 
-        text = message['text']
+        text = message.text
 
         formatters = [
             lambda identifier: "%s " % identifier,
@@ -232,7 +623,8 @@ class Bot(object):
 
         for identifier in my_identifiers:
             if text.startswith(identifier):
-                self.log.debug("sent to me:\n%s", pprint.pformat(message))
+                log_record(self.log, logging.DEBUG, 'addressed', self.debug_sample_rate,
+                           channel=message.channel, user=message.user, size=len(text))
                 return identifier
 
         return None
@@ -248,7 +640,12 @@ class Bot(object):
         response_handler = None
 
         if isinstance(res, basestring):
-            response_handler = functools.partial(self._send_rtm_message, event['channel'])
+            if self.ws is not None:
+                response_handler = functools.partial(self._send_rtm_message, event['channel'])
+            else:
+                # Without an RTM connection (eg when serving the Events API), post as the bot instead.
+                res = {'channel': event['channel'], 'text': res, 'as_user': True}
+                response_handler = self._send_api_message
         elif isinstance(res, dict):
             response_handler = self._send_api_message
 
@@ -296,12 +693,15 @@ class Bot(object):
             else:
                 remaining_str = remaining_str[last_line_break:]
 
-        self.log.debug("_handle_long_response: splitting long response %s, returns: \n %s",
-                pprint.pformat(res), pprint.pformat(responses))
+        log_record(self.log, logging.DEBUG, 'split_response', self.debug_sample_rate,
+                   size=message_length, parts=len(responses))
         return responses
 
     def _send_rtm_message(self, channel_id, text):
-        """Send a Slack message to a channel over RTM.
+        """Queue a Slack message to a channel over RTM.
+
+        This returns immediately; the message is sent from the writer thread.
+        Delivery failures are passed to :func:`on_send_failed`.
 
         :param channel_id: a slack channel id.
         :param text: a slack message. Serverside formatting is done
@@ -309,75 +709,243 @@ class Bot(object):
           `Slack's docs <https://api.slack.com/docs/formatting>`__.
         """
 
-        message = {
-            'id': self._current_message_id,
+        self._writer.send({
             'type': 'message',
             'channel': channel_id,
             'text': text,
-        }
-        self.ws.send(json.dumps(message))
-        self._current_message_id += 1
+        })
 
     def _send_api_message(self, message):
         """Send a Slack message via the chat.postMessage api.
 
-        :param message: a dict of kwargs to be passed to slacker.
+        :param message: a dict of chat.postMessage arguments.
         """
 
-        self.slack.chat.post_message(**message)
+        self.api.call('chat.postMessage', **message)
         self.log.debug("sent api message %r", message)
 
-    # Websocket callbacks.
-    def _on_message(self, ws, raw_event):
-        try:
-            event = json.loads(raw_event)
-            if 'type' not in event or event['type'] != 'message':
-                return
+    def _handle_event(self, event):
+        """Dispatch a Slack event to the matching command and send its response.
 
-            if 'text' not in event:
-                # These are mostly changed messages, which we don't respond to right now.
-                return
+        This is shared by the RTM and Events API transports.
+
+        :param event: an :class:`Event`.
+        """
+        self.directory.handle_event(event)
+
+        if event.type != 'message' or not self.active:
+            return
 
-            identifier = self._bot_identifier(event)
-            if not identifier:
+        if event.text is None:
+            # These are mostly changed messages, which we don't respond to right now.
+            return
+
+        for result in self._run_hooks('pre_parse', event):
+            if result is False:
                 return
 
-            body = event['text'].partition(identifier)[2].strip()
-            cmd, _, rest = body.partition(' ')
+        identifier = self._bot_identifier(event)
+        if not identifier:
+            return
 
-            if cmd in self.commands:
-                try:
-                    res = self.commands[cmd](rest, self, event)
-                except Exception as e:
-                    self.log.exception("%s while handling %r", e, body)
+        body = event.text.partition(identifier)[2].strip()
+        cmd, _, rest = body.partition(' ')
 
+        duration = None
+        if cmd in self.commands:
+            request = (event.user, event.channel, body)
+            started = time.time()
+            if not self._start_request(request, event, started):
+                self.log.debug("dropping duplicate of in-flight request %r", body)
+                self.stats.incr('command.duplicate')
+                return
+
+            ack = None
+            if self.ack_after is not None:
+                ack = self.scheduler.add(time.time() + self.ack_after, _acknowledge, args=(event,))
+            try:
+                res = None
+                for res in self._run_hooks('pre_dispatch', event, cmd, rest):
+                    if res is not None:
+                        break
+
+                if res is None:
+                    start = time.time()
+                    try:
+                        res = self.commands[cmd](rest, self, event)
+                    finally:
+                        duration = time.time() - start
+                        self.stats.record('command.%s' % cmd, duration)
+            except Exception as e:
+                self.log.exception("%s while handling %r", e, body)
+                t, v, tb = sys.exc_info()
+
+                res = None
+                for res in self._run_hooks('on_error', event, e):
+                    if res is not None:
+                        break
+
+                if res is None:
                     # Send the exception and the final line of the traceback.
                     # TODO this doesn't always pick out the right line.
-                    t, v, tb = sys.exc_info()
                     res = ''.join(traceback.format_exception_only(t, v))
                     tb_entries = traceback.extract_tb(tb, 3)
                     res += ''.join(traceback.format_list(tb_entries[2:]))
+            finally:
+                if ack is not None:
+                    ack.cancel()
+                self._finish_request(request, event, started)
+        else:
+            res = "Unrecognized command.\n%s" % self.help_text()
+
+        for key, hook in self._middleware_hooks['post_response']:
+            start = time.time()
+            try:
+                res = hook(self, event, res)
+            finally:
+                self.stats.record(key, time.time() - start)
+
+        if res is None:
+            return
+
+        log_record(self.log, logging.DEBUG, 'command', self.debug_sample_rate,
+                   command=cmd, channel=event.channel, user=event.user, duration=duration,
+                   size=len(res if isinstance(res, basestring) else res.get('text') or ''))
+        self._send_response(res, event)
+
+    def _start_request(self, request, event, now):
+        """Return True if a request should run, or False if it duplicates one in flight.
+
+        A request also counts as a duplicate if it was sent (going by its ``ts``) before an identical one finished,
+        since RTM messages that arrive while a command runs are only read after it's done.
+        """
+        with self._requests_lock:
+            finished = self._finished
+            while finished:
+                oldest = next(iter(finished))
+                if finished[oldest][0] >= now - self.request_memory:
+                    break
+                del finished[oldest]
+
+            if request in self._in_flight:
+                return False
+            if request in finished and event.ts is not None and float(event.ts) <= finished[request][1]:
+                return False
+
+            self._in_flight.add(request)
+            return True
+
+    def _finish_request(self, request, event, started):
+        now = time.time()
+        with self._requests_lock:
+            self._in_flight.discard(request)
+            self._finished.pop(request, None)
+            if event.ts is not None:
+                # Estimate when it finished on Slack's clock, to compare with later requests' ts
+                # without depending on the local clock agreeing with Slack's.
+                self._finished[request] = (now, float(event.ts) + (now - started))
+
+    def _acknowledge(self, event):
+        """Show the user that a slow command is being worked on."""
+        if self.ack_text is not None:
+            self._send_response(self.ack_text, event)
+        elif self._writer is not None:
+            # Slack doesn't reply to typing events, so don't wait for one.
+            self._writer.send({'type': 'typing', 'channel': event.channel}, expect_reply=False)
+
+    def _send_response(self, res, event):
+        """Send a command-style response, splitting it if necessary.
+
+        :param res: a string or dict response. See the command docstring.
+        :param event: the event being responded to. Only its channel is required.
+        """
+        if self.snippet_threshold is not None:
+            if isinstance(res, basestring):
+                fields = {'text': res}
+            elif SNIPPET_FIELDS.issuperset(res):
+                fields = res
             else:
-                res = "Unrecognized command.\n%s" % self.help_text()
+                fields = {}
+
+            text = fields.get('text') or ''
+            if len(text) > self.snippet_threshold:
+                channel = fields.get('channel') or event['channel']
+                try:
+                    self._upload_snippet(channel, text, fields.get('thread_ts'))
+                    return
+                except Exception as e:
+                    self.log.warning("%s uploading response as a snippet; sending it as messages instead", e)
+
+        responses = self._handle_long_response(res)
+        for r in responses:
+            self._handle_command_response(r, event)
+
+    def _upload_snippet(self, channel_id, text, thread_ts=None):
+        """Send text to a channel as a single snippet via files.upload.
+
+        The text is passed to the api as-is rather than through a file, and
+        the snippet is posted with a one-line summary as its comment.
+
+        :param channel_id: a slack channel id.
+        :param text: the full response text.
+        :param thread_ts: the thread to post the snippet in, if any.
+        """
+        first_line = text[:SNIPPET_SUMMARY_LENGTH].partition('\n')[0]
+        summary = "%s\n_(%s lines, %s characters; full response attached)_" % (
+            first_line, text.count('\n') + 1, len(text))
+
+        data = {
+            'channels': channel_id,
+            'content': text,
+            'filetype': 'text',
+            'filename': 'response.txt',
+            'initial_comment': summary,
+        }
+        if thread_ts is not None:
+            data['thread_ts'] = thread_ts
 
-            self.log.debug("received command response %r", res)
-            responses = self._handle_long_response(res)
-            for r in responses:
-                self._handle_command_response(r, event)
+        self.slack.files.post('files.upload', data=data)
+        self.log.debug("uploaded %s character response to %s as a snippet", len(text), channel_id)
+
+    # Websocket callbacks.
+    def _on_message(self, ws, raw_event):
+        try:
+            event = Event.decode(raw_event, self.codec)
+            if event.reply_to is not None and event.type in (None, 'pong'):
+                # Acknowledgment of a frame we sent.
+                rtt = self._writer.ack(event)
+                if event.type == 'pong' and self._keepalive is not None:
+                    self._keepalive.pong(event, rtt)
+                return
 
+            self._handle_event(event)
         except Exception as e:
             # websocket-client swallows exceptions in callbacks
-            self.log.exception("%s during _on_message. event:\n%s", e, pprint.pformat(raw_event))
+            self.log.exception("%s during _on_message. event:\n%s", e, lazy_pformat(raw_event))
 
     def _on_error(self, ws, error):
         self.log.error(error)
 
     def _on_close(self, ws, code, reason):
         self.log.warning("websocket closed. code: %r, reason: %r", code, reason)
+        if self._keepalive is not None:
+            self._keepalive.stop()
+        self._writer.stop()
 
-        # Attempt to reconnect.
-        # No need to reset _current_message_id: slack just requires ids that are unique per session.
-        self.run_forever()
+        # run_forever reconnects once ws.run_forever returns.
+        self._disconnected = True
 
     def _on_open(self, ws):
         self.log.info("websocket opened")
+        self._writer.start()
+        if self._keepalive is not None:
+            self._keepalive.start()
+
+    def _reconnect(self, reason):
+        """Drop the current connection; :func:`run_forever` will open a new one."""
+        self.log.warning("reconnecting: %s", reason)
+
+        # Unlike close(), this wakes up the thread blocked reading the socket.
+        sock = self.ws.sock
+        if sock is not None:
+            sock.abort()
@@ -0,0 +1,85 @@
+"""
+JSON codecs for RTM frames and Events API bodies.
+
+:func:`default_codec` picks the fastest installed library.
+None of them are required; the stdlib json module is always available as a fallback.
+"""
+
+import json
+
+
+class JsonCodec(object):
+    """Decodes and encodes JSON with a particular library.
+
+    :func:`loads` accepts text or utf-8 bytes, so frames don't need decoding first.
+    :func:`dumps` always returns text.
+    """
+
+    def __init__(self, name, loads, dumps):
+        #: the library's module name.
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self):
+        return '<JsonCodec %s>' % self.name
+
+
+def _orjson():
+    import orjson
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+
+    return JsonCodec('orjson', orjson.loads, dumps)
+
+
+def _ujson():
+    import ujson
+    return JsonCodec('ujson', ujson.loads, ujson.dumps)
+
+
+def _rapidjson():
+    import rapidjson
+    return JsonCodec('rapidjson', rapidjson.loads, rapidjson.dumps)
+
+
+def _stdlib():
+    return JsonCodec('json', json.loads, json.dumps)
+
+
+# In order of preference.
+_FACTORIES = (
+    ('orjson', _orjson),
+    ('ujson', _ujson),
+    ('rapidjson', _rapidjson),
+    ('json', _stdlib),
+)
+
+
+def available_codecs():
+    """Return a list of a :class:`JsonCodec` for each installed library, fastest first."""
+    codecs = []
+    for _, factory in _FACTORIES:
+        try:
+            codecs.append(factory())
+        except ImportError:
+            pass
+    return codecs
+
+
+def get_codec(name):
+    """Return the :class:`JsonCodec` for a library by module name.
+
+    :raises ImportError: if the library isn't installed.
+    :raises ValueError: if the name isn't a supported library.
+    """
+    for codec_name, factory in _FACTORIES:
+        if codec_name == name:
+            return factory()
+    raise ValueError("unsupported json library %r" % name)
+
+
+def default_codec():
+    """Return the fastest installed :class:`JsonCodec`."""
+    return available_codecs()[0]
@@ -0,0 +1,278 @@
+import collections
+import threading
+
+# Records keep only the fields commands actually look up;
+# the full Slack objects are dropped after indexing.
+User = collections.namedtuple('User', 'id name real_name email is_bot deleted')
+Channel = collections.namedtuple('Channel', 'id name is_member is_archived')
+Im = collections.namedtuple('Im', 'id user')
+
+
+def _user_record(user):
+    profile = user.get('profile') or {}
+    return User(
+        user['id'],
+        user.get('name'),
+        user.get('real_name') or profile.get('real_name'),
+        profile.get('email'),
+        user.get('is_bot', False),
+        user.get('deleted', False),
+    )
+
+
+def _channel_record(channel, is_member=None):
+    if is_member is None:
+        is_member = channel.get('is_member', False)
+    return Channel(
+        channel['id'],
+        channel.get('name'),
+        is_member,
+        channel.get('is_archived', False),
+    )
+
+
+def _im_record(im):
+    return Im(im['id'], im.get('user'))
+
+
+class _Index(object):
+    """Records of one kind, indexed by id and by any number of secondary keys."""
+
+    def __init__(self, keys):
+        self.keys = keys
+        self.by_id = {}
+        self.by_key = dict((key, {}) for key in keys)
+
+    def add(self, record):
+        old = self.by_id.get(record.id)
+        if old is not None:
+            self._unindex(old)
+
+        self.by_id[record.id] = record
+        for key in self.keys:
+            value = getattr(record, key)
+            if value:
+                self.by_key[key][value] = record.id
+
+    def _unindex(self, record):
+        for key in self.keys:
+            index = self.by_key[key]
+            value = getattr(record, key)
+            if index.get(value) == record.id:
+                del index[value]
+
+    def get(self, record_id):
+        return self.by_id.get(record_id)
+
+    def get_by(self, key, value):
+        record_id = self.by_key[key].get(value)
+        if record_id is None:
+            return None
+        return self.by_id.get(record_id)
+
+
+class Directory(object):
+    """
+    A cache of the workspace's users, channels and IMs.
+
+    Each kind is loaded from the Web API (following pagination) the first time
+    it is looked up, then kept current from RTM events; lookups never do IO after that.
+    Lookup methods return compact records (namedtuples), or None when nothing matches.
+    """
+
+    #: how many records to request per Web API page.
+    page_size = 200
+
+    _record_types = {
+        'users': User,
+        'channels': Channel,
+        'ims': Im,
+    }
+
+    _sources = {
+        'users': ('users', 'users.list', 'members', _user_record, ('name', 'email')),
+        'channels': ('channels', 'channels.list', 'channels', _channel_record, ('name',)),
+        'ims': ('im', 'im.list', 'ims', _im_record, ('user',)),
+    }
+
+    def __init__(self, bot):
+        """
+        :param bot: the Bot that owns this directory. Its `slack` client is used for loading.
+        """
+        self._bot = bot
+        self._indexes = {}
+        self._seeds = {}
+        # kind -> records updated from events while load() fetches it.
+        self._loading = {}
+        self._lock = threading.RLock()
+
+        self._event_handlers = {
+            'user_change': self._on_user,
+            'team_join': self._on_user,
+            'channel_created': self._on_channel,
+            'channel_rename': self._on_channel,
+            'member_joined_channel': self._on_member_joined_channel,
+            'channel_joined': self._on_channel_joined,
+            'im_created': self._on_im_created,
+        }
+
+    def _index(self, kind):
+        index = self._indexes.get(kind)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(kind)
+                if index is None:
+                    seed = self._seeds.pop(kind, None)
+                    index = self._load(kind) if seed is None else self._build(kind, *seed)
+                    self._indexes[kind] = index
+        return index
+
+    def _build(self, kind, items, to_record):
+        index = _Index(self._sources[kind][4])
+        for item in items:
+            index.add(to_record(item))
+        return index
+
+    def _load(self, kind):
+        api_name, method, field, to_record, keys = self._sources[kind]
+        api = getattr(self._bot.slack, api_name)
+
+        index = _Index(keys)
+        cursor = None
+        while True:
+            params = {'limit': self.page_size}
+            if cursor:
+                params['cursor'] = cursor
+
+            body = api.get(method, params=params).body
+            for item in body.get(field, ()):
+                index.add(to_record(item))
+
+            cursor = (body.get('response_metadata') or {}).get('next_cursor')
+            if not cursor:
+                break
+
+        self._bot.log.info("loaded %s %s into directory", len(index.by_id), kind)
+        return index
+
+    def load(self, kinds=None):
+        """Load (or reload) the given kinds, or all of them.
+
+        This is optional; each kind is otherwise loaded on first lookup.
+
+        :param kinds: an iterable of ``'users'``, ``'channels'`` and ``'ims'``.
+        """
+        for kind in kinds or self._sources:
+            with self._lock:
+                self._loading[kind] = []
+            try:
+                index = self._load(kind)
+            except Exception:
+                with self._lock:
+                    del self._loading[kind]
+                raise
+
+            with self._lock:
+                # The fetched data may predate events applied while fetching it.
+                for record in self._loading.pop(kind):
+                    index.add(record)
+                self._seeds.pop(kind, None)
+                self._indexes[kind] = index
+
+    def seed(self, kind, items, rows=False):
+        """Provide data for a kind without calling the Web API, replacing what's cached.
+
+        Indexing is deferred until the kind is first looked up.
+
+        :param kind: ``'users'``, ``'channels'`` or ``'ims'``.
+        :param items: Slack objects (eg from rtm.start), or rows from :func:`rows`.
+        :param rows: True if `items` are rows.
+        """
+        if rows:
+            record_type = self._record_types[kind]
+            to_record = lambda row: record_type(*row)
+        else:
+            to_record = self._sources[kind][3]
+
+        with self._lock:
+            self._indexes.pop(kind, None)
+            self._seeds[kind] = (items, to_record)
+
+    def rows(self, kind):
+        """Return the cached records of a kind as a list of tuples, or None if it isn't loaded.
+
+        These can be passed back to :func:`seed`.
+        """
+        if kind not in self._indexes and kind not in self._seeds:
+            return None
+        return [tuple(record) for record in self._index(kind).by_id.values()]
+
+    def user(self, user_id):
+        return self._index('users').get(user_id)
+
+    def user_by_name(self, name):
+        return self._index('users').get_by('name', name)
+
+    def user_by_email(self, email):
+        return self._index('users').get_by('email', email)
+
+    def channel(self, channel_id):
+        return self._index('channels').get(channel_id)
+
+    def channel_by_name(self, name):
+        return self._index('channels').get_by('name', name.lstrip('#'))
+
+    def im(self, im_id):
+        return self._index('ims').get(im_id)
+
+    def im_for_user(self, user_id):
+        return self._index('ims').get_by('user', user_id)
+
+    def handle_event(self, event):
+        """Apply an RTM event to any kinds that are already loaded.
+
+        Kinds that have not been loaded yet are skipped; they'll be current when they are.
+        """
+        handler = self._event_handlers.get(event.get('type'))
+        if handler is not None:
+            handler(event)
+
+    def _loaded_index(self, kind):
+        """Return the index for a kind if it's loaded or seeded, without calling the Web API."""
+        with self._lock:
+            if kind in self._indexes or kind in self._seeds:
+                return self._index(kind)
+        return None
+
+    def _update(self, kind, record):
+        with self._lock:
+            index = self._loaded_index(kind)
+            if index is not None:
+                index.add(record)
+            if kind in self._loading:
+                self._loading[kind].append(record)
+
+    def _on_user(self, event):
+        self._update('users', _user_record(event['user']))
+
+    def _on_channel(self, event):
+        channel = event['channel']
+        index = self._loaded_index('channels')
+        existing = index and index.get(channel['id'])
+        is_member = existing.is_member if existing else None
+        self._update('channels', _channel_record(channel, is_member))
+
+    def _on_channel_joined(self, event):
+        self._update('channels', _channel_record(event['channel'], True))
+
+    def _on_member_joined_channel(self, event):
+        if event.get('user') != self._bot.id:
+            return
+
+        index = self._loaded_index('channels')
+        existing = index and index.get(event['channel'])
+        if existing:
+            self._update('channels', existing._replace(is_member=True))
+
+    def _on_im_created(self, event):
+        self._update('ims', Im(event['channel']['id'], event.get('user')))
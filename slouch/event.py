@@ -0,0 +1,134 @@
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+#: fields kept as attributes on every :class:`Event`; everything else is held in a dict.
+HOT_FIELDS = ('type', 'channel', 'user', 'text', 'ts', 'reply_to')
+
+_MISSING = object()
+
+
+class Event(MutableMapping):
+    """
+    A Slack event, as passed to commands and middleware.
+
+    The fields needed for dispatch (:data:`HOT_FIELDS`) are held as attributes,
+    and the rest in the dict they were decoded into: :func:`decode` parses each frame once.
+    An event can instead be created holding the raw frame, which is smaller to keep around;
+    it's decoded again only if a field other than the hot fields is accessed.
+
+    For compatibility, events are mutable mappings, so they can be used like the
+    dicts they replace: ``event['user']``, ``event.get('thread_ts')``, ``'text' in event``,
+    ``event.items()`` and ``dict(event)`` all work.
+    Hot fields that weren't sent are None as attributes, but raise KeyError on item access.
+
+    On Python 2 the mapping base classes don't define ``__slots__``, so each instance also
+    has ``__dict__`` and ``__weakref__`` slots (16 bytes), though the dict is never created.
+    """
+
+    __slots__ = HOT_FIELDS + ('_absent', '_raw', '_codec', '_extra')
+
+    def __init__(self, fields, raw=None, codec=None):
+        """
+        :param fields: a dict of the event's fields.
+        :param raw: the frame `fields` was decoded from. If given, fields other than
+          the hot fields are dropped and re-decoded from it when needed.
+        :param codec: the :class:`~slouch.codec.JsonCodec` to decode `raw` with.
+        """
+        if raw is not None:
+            self._raw = raw
+            self._codec = codec
+            self._take(dict((name, fields[name]) for name in HOT_FIELDS if name in fields))
+            self._extra = None
+        else:
+            self._raw = None
+            self._codec = None
+            self._take(dict(fields))
+
+    @classmethod
+    def decode(cls, raw, codec):
+        """Return an Event for a raw json frame, keeping the dict it's decoded into."""
+        event = cls.__new__(cls)
+        event._raw = None
+        event._codec = None
+        event._take(codec.loads(raw))
+        return event
+
+    def _take(self, fields):
+        """Move the hot fields out of `fields` into attributes, and keep the rest."""
+        absent = ()
+        pop = fields.pop
+        for name in HOT_FIELDS:
+            value = pop(name, _MISSING)
+            if value is _MISSING:
+                # Tell hot fields that weren't sent apart from ones sent as null.
+                absent += (name,)
+                value = None
+            setattr(self, name, value)
+        self._absent = absent
+        self._extra = fields
+
+    def _cold(self):
+        extra = self._extra
+        if extra is None:
+            raw = self._raw
+            if raw is None:
+                # Another thread decoded it between our reads.
+                return self._extra
+
+            fields = self._codec.loads(raw)
+            extra = dict((k, v) for k, v in fields.items() if k not in HOT_FIELDS)
+            self._extra = extra
+            self._raw = None
+        return extra
+
+    def __getitem__(self, key):
+        if key in HOT_FIELDS:
+            if key in self._absent:
+                raise KeyError(key)
+            return getattr(self, key)
+        return self._cold()[key]
+
+    def __setitem__(self, key, value):
+        if key in HOT_FIELDS:
+            setattr(self, key, value)
+            if key in self._absent:
+                self._absent = tuple(name for name in self._absent if name != key)
+        else:
+            self._cold()[key] = value
+
+    def __delitem__(self, key):
+        if key in HOT_FIELDS:
+            if key in self._absent:
+                raise KeyError(key)
+            setattr(self, key, None)
+            self._absent += (key,)
+        else:
+            del self._cold()[key]
+
+    def __contains__(self, key):
+        if key in HOT_FIELDS:
+            return key not in self._absent
+        return key in self._cold()
+
+    def __iter__(self):
+        for name in HOT_FIELDS:
+            if name not in self._absent:
+                yield name
+        for key in list(self._cold()):
+            yield key
+
+    def __len__(self):
+        return len(HOT_FIELDS) - len(self._absent) + len(self._cold())
+
+    def to_dict(self):
+        """Return all of the event's fields as a new dict."""
+        return dict((key, self[key]) for key in self)
+
+    def copy(self):
+        """Return a shallow copy, like ``dict.copy``."""
+        return Event(self.to_dict())
+
+    def __repr__(self):
+        return 'Event(%r)' % self.to_dict()
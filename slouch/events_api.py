@@ -0,0 +1,104 @@
+import hashlib
+import hmac
+import logging
+import time
+
+from .event import Event
+from .workers import WorkerPool
+
+log = logging.getLogger(__name__)
+
+# Slack recommends rejecting requests older than this to prevent replays.
+# See https://api.slack.com/authentication/verifying-requests-from-slack
+MAX_REQUEST_AGE = 60 * 5
+
+
+def request_signature(signing_secret, timestamp, body):
+    """Return the ``X-Slack-Signature`` value Slack would send for a request.
+
+    :param signing_secret: the app's signing secret.
+    :param timestamp: the ``X-Slack-Request-Timestamp`` value.
+    :param body: the raw request body (a byte string).
+    """
+    base = b'v0:' + str(timestamp).encode('utf-8') + b':' + body
+    digest = hmac.new(signing_secret.encode('utf-8'), base, hashlib.sha256).hexdigest()
+    return 'v0=' + digest
+
+
+class EventsApp(object):
+    """
+    A WSGI application serving Slack's `Events API <https://api.slack.com/events-api>`__.
+
+    Requests are verified and acknowledged immediately; events are handed to a
+    :class:`WorkerPool` and dispatched through the same pipeline as RTM messages.
+    Because no state is kept in the connection, any number of these can run behind a load balancer.
+
+    Create one with :func:`Bot.events_app`.
+    """
+
+    def __init__(self, bot, signing_secret, workers=4):
+        """
+        :param bot: the Bot to dispatch events to.
+        :param signing_secret: the app's signing secret, used to verify requests.
+        :param workers: the number of threads handling events.
+        """
+        self.bot = bot
+        self.signing_secret = signing_secret
+        self.pool = WorkerPool(workers, name='slouch-events')
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') != 'POST':
+            return self._respond(start_response, '405 Method Not Allowed')
+
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        body = environ['wsgi.input'].read(length)
+
+        if not self._verify(environ, body):
+            return self._respond(start_response, '401 Unauthorized')
+
+        try:
+            payload = self.bot.codec.loads(body)
+        except ValueError:
+            return self._respond(start_response, '400 Bad Request')
+
+        payload_type = payload.get('type')
+        if payload_type == 'url_verification':
+            return self._respond(start_response, '200 OK', payload.get('challenge', ''))
+
+        if payload_type == 'event_callback' and 'event' in payload:
+            self.pool.submit(self._dispatch, Event(payload['event']))
+
+        return self._respond(start_response, '200 OK')
+
+    def _verify(self, environ, body):
+        timestamp = environ.get('HTTP_X_SLACK_REQUEST_TIMESTAMP', '')
+        signature = environ.get('HTTP_X_SLACK_SIGNATURE', '')
+
+        try:
+            age = abs(time.time() - int(timestamp))
+        except ValueError:
+            return False
+        if age > MAX_REQUEST_AGE:
+            log.warning("rejecting events api request with stale timestamp %r", timestamp)
+            return False
+
+        expected = request_signature(self.signing_secret, timestamp, body)
+        return hmac.compare_digest(expected.encode('utf-8'), signature.encode('utf-8'))
+
+    def _dispatch(self, event):
+        try:
+            self.bot._handle_event(event)
+        except Exception as e:
+            self.bot.log.exception("%s while handling events api event %r", e, event)
+
+    @staticmethod
+    def _respond(start_response, status, text=''):
+        body = text.encode('utf-8')
+        start_response(status, [
+            ('Content-Type', 'text/plain; charset=utf-8'),
+            ('Content-Length', str(len(body))),
+        ])
+        return [body]
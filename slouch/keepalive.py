@@ -0,0 +1,85 @@
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class Keepalive(object):
+    """
+    Sends RTM ``ping`` frames on an interval and detects dead or degraded connections.
+
+    Round trip times are recorded by the writer as ``rtm.ack.ping``.
+    `on_dead` is called (once) when a pong doesn't arrive within `timeout`,
+    or when `degraded_pings` pings in a row take longer than `max_rtt`.
+    """
+
+    def __init__(self, writer, stats, on_dead, interval, timeout, max_rtt=None, degraded_pings=3):
+        """
+        :param writer: the :class:`~slouch.writer.RtmWriter` to send pings with.
+        :param stats: the :class:`~slouch.stats.Stats` to count reconnects in.
+        :param on_dead: called with a reason string when the connection should be replaced.
+        :param interval: seconds between pings.
+        :param timeout: seconds to wait for a pong.
+        :param max_rtt: seconds a round trip may take before it counts as degraded, or None.
+        :param degraded_pings: how many degraded round trips in a row trigger `on_dead`.
+        """
+        self.writer = writer
+        self.stats = stats
+        self.on_dead = on_dead
+        self.interval = interval
+        self.timeout = timeout
+        self.max_rtt = max_rtt
+        self.degraded_pings = degraded_pings
+
+        #: the most recent round trip time, in seconds.
+        self.last_rtt = None
+
+        self._slow_pings = 0
+        self._pong = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='slouch-keepalive')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._pong.set()
+
+    def pong(self, reply, rtt):
+        """Handle a ``pong`` frame.
+
+        :param reply: the pong event.
+        :param rtt: its round trip time, as returned by :func:`RtmWriter.ack`.
+        """
+        if rtt is None:
+            # Not a ping we're waiting on.
+            return
+
+        self.last_rtt = rtt
+        if self.max_rtt is not None and rtt > self.max_rtt:
+            self._slow_pings += 1
+        else:
+            self._slow_pings = 0
+        self._pong.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self._pong.clear()
+            self.writer.send({'type': 'ping'})
+
+            if not self._pong.wait(self.timeout):
+                self._dead("no pong within %ss" % self.timeout)
+                return
+            if self._stopped.is_set():
+                return
+
+            if self._slow_pings >= self.degraded_pings:
+                self._dead("%s round trips slower than %ss" % (self._slow_pings, self.max_rtt))
+                return
+
+    def _dead(self, reason):
+        self.stats.incr('rtm.keepalive.reconnect')
+        self.on_dead(reason)
@@ -0,0 +1,68 @@
+import abc
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# abc.ABC, spelled so it works on Python 2 as well.
+_ABC = abc.ABCMeta('_ABC', (object,), {})
+
+
+class Lease(_ABC):
+    """
+    Decides which of several instances of a bot is active; see :func:`Bot.run_forever`.
+
+    Subclass this to keep the lease in storage shared by every instance, eg a database row
+    or a key with an expiry. :func:`acquire` is called every :attr:`Bot.lease_interval` seconds
+    by the active instance (to renew the lease) and by standbys (to take it over), so it should
+    return quickly rather than wait for the lease. A lease that expires should outlast a few
+    missed renewals, and lapse soon after that.
+    """
+
+    @abc.abstractmethod
+    def acquire(self):
+        """Take or renew the lease, and return True if this instance now holds it."""
+
+    @abc.abstractmethod
+    def release(self):
+        """Give up the lease if it's held."""
+
+
+class FileLease(Lease):
+    """
+    A lease held as an exclusive lock on a local file.
+
+    The operating system drops the lock as soon as the holding process exits, however it exits,
+    so this suits instances on a single host (and testing). It requires ``fcntl``, ie a Unix.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: the file to lock. It's created if it doesn't exist; its contents are unused.
+        """
+        if fcntl is None:
+            raise RuntimeError("FileLease requires fcntl, which isn't available on this platform")
+
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        if self._file is not None:
+            return True
+
+        f = open(self.path, 'a')
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            f.close()
+            return False
+
+        self._file = f
+        return True
+
+    def release(self):
+        f, self._file = self._file, None
+        if f is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            f.close()
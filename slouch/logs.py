@@ -0,0 +1,64 @@
+"""
+Logging helpers for slouch's hot paths.
+
+Nothing here does any formatting unless a record is actually emitted,
+so leaving these calls in costs a level check when debug logging is off.
+"""
+
+import pprint
+import random
+
+
+class LazyFormat(object):
+    """Calls ``func(*args)`` only when converted to a string, eg by an emitting handler."""
+
+    __slots__ = ('func', 'args')
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return self.func(*self.args)
+
+
+def lazy_pformat(obj):
+    """Return `obj` pretty-printed by :func:`pprint.pformat`, when the record is emitted."""
+    return LazyFormat(pprint.pformat, obj)
+
+
+class Record(object):
+    """A structured message: an event name and key-value fields, formatted as ``event k=v ...``."""
+
+    __slots__ = ('event', 'fields')
+
+    def __init__(self, event, fields):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        parts = [self.event]
+        for key in sorted(self.fields):
+            value = self.fields[key]
+            if isinstance(value, float):
+                value = '%.6f' % value
+            parts.append('%s=%s' % (key, value))
+        return ' '.join(parts)
+
+
+def log_record(logger, level, event, sample_rate=1.0, **fields):
+    """Log a structured :class:`Record` if `level` is enabled.
+
+    The fields are also attached to the log record as ``record.slouch``
+    (a dict including ``event``) for handlers that emit structured output.
+
+    :param sample_rate: the fraction of calls to emit, for high-volume events.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if sample_rate < 1.0 and random.random() >= sample_rate:
+        return
+
+    extra = dict(fields)
+    extra['event'] = event
+    logger.log(level, '%s', Record(event, fields), extra={'slouch': extra})
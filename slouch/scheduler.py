@@ -0,0 +1,238 @@
+import datetime
+import heapq
+import importlib
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+def _timestamp(when):
+    """Convert a naive local datetime or a unix timestamp to a unix timestamp."""
+    if isinstance(when, datetime.datetime):
+        return time.mktime(when.timetuple()) + when.microsecond / 1e6
+    return float(when)
+
+
+def _func_ref(func):
+    """Return an importable 'module:name' reference to func, or raise ValueError."""
+    ref = '%s:%s' % (func.__module__, func.__name__)
+    if _resolve(ref) is not func:
+        raise ValueError("%r can't be persisted; only module-level functions can" % func)
+    return ref
+
+
+def _resolve(ref):
+    module_name, _, name = ref.partition(':')
+    try:
+        return getattr(importlib.import_module(module_name), name)
+    except (ImportError, AttributeError):
+        return None
+
+
+class Job(object):
+    """A pending call made by a :class:`Scheduler`. Use :func:`cancel` to drop it."""
+
+    __slots__ = ('scheduler', 'when', 'interval', 'func', 'args', 'channel', 'persist', 'key', 'cancelled')
+
+    def __init__(self, scheduler, when, func, args, channel, interval, persist, key=None):
+        self.scheduler = scheduler
+        self.when = when
+        self.func = func
+        self.args = tuple(args)
+        self.channel = channel
+        self.interval = interval
+        self.persist = persist
+        self.key = key
+        self.cancelled = False
+
+    def cancel(self):
+        """Prevent this job from running again."""
+        self.cancelled = True
+        if self.persist:
+            self.scheduler._save()
+
+    def as_dict(self):
+        return {
+            'when': self.when,
+            'func': _func_ref(self.func),
+            'args': list(self.args),
+            'channel': self.channel,
+            'interval': self.interval,
+            'key': self.key,
+        }
+
+
+class Scheduler(object):
+    """
+    Runs jobs for a Bot at a given time or interval, on a single background thread.
+
+    Pending jobs are kept in a heap, so scheduling and cancelling are cheap even with
+    many thousands pending; cancelled jobs are discarded when they come due.
+    Jobs run one at a time and should be quick; hand longer work off to another thread.
+
+    Use :func:`Bot.schedule_at` and :func:`Bot.every` rather than using this directly.
+    """
+
+    def __init__(self, bot, path=None):
+        """
+        :param bot: the Bot jobs are run for.
+        :param path: a file to persist jobs scheduled with ``persist=True`` to, or None.
+        """
+        self._bot = bot
+        self.path = path
+
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._restored = False
+        self._save_lock = threading.Lock()
+
+    def add(self, when, func, args=(), channel=None, interval=None, persist=False, key=None):
+        """Schedule `func` and return its :class:`Job`. See :func:`Bot.schedule_at` for arguments."""
+        job = Job(self, _timestamp(when), func, args, channel, interval, persist, key)
+        if persist:
+            if self.path is None:
+                raise ValueError("persisting jobs requires a schedule path")
+            _func_ref(func)
+
+        if key is not None:
+            with self._cond:
+                for _, _, other in self._heap:
+                    if other.key == key:
+                        other.cancelled = True
+
+        self._push(job)
+        if persist:
+            self._save()
+        return job
+
+    def _push(self, job):
+        with self._cond:
+            heapq.heappush(self._heap, (job.when, next(self._seq), job))
+            self._cond.notify()
+
+        if self._thread is None:
+            self.start()
+
+    def pending(self):
+        """Return the number of jobs that have not run or been cancelled."""
+        with self._cond:
+            return sum(1 for _, _, job in self._heap if not job.cancelled)
+
+    def start(self):
+        """Start the scheduler thread, restoring persisted jobs the first time."""
+        with self._cond:
+            if self._thread is not None:
+                return
+
+            if not self._restored:
+                self._restored = True
+                self._restore()
+
+            thread = threading.Thread(target=self._run, name='slouch-scheduler')
+            thread.daemon = True
+            thread.start()
+            self._thread = thread
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+
+                    when, _, job = self._heap[0]
+                    if job.cancelled:
+                        heapq.heappop(self._heap)
+                        continue
+
+                    delay = when - time.time()
+                    if delay <= 0:
+                        heapq.heappop(self._heap)
+                        break
+                    self._cond.wait(delay)
+
+            self._execute(job)
+
+    def _execute(self, job):
+        # Standbys keep their schedule but leave running jobs to the active instance.
+        if self._bot.active:
+            try:
+                res = job.func(self._bot, *job.args)
+                if res is not None and job.channel is not None:
+                    self._bot._send_response(res, {'channel': job.channel})
+            except Exception as e:
+                self._bot.log.exception("%s while running scheduled job %r", e, job.func)
+
+        if job.interval and not job.cancelled:
+            # Schedule from the previous deadline so periodic jobs don't drift.
+            job.when = max(job.when + job.interval, time.time())
+            self._push(job)
+
+        if job.persist:
+            self._save()
+
+    def _persistent_jobs(self):
+        with self._cond:
+            return [job for _, _, job in self._heap if job.persist and not job.cancelled]
+
+    def reload(self):
+        """Replace the persisted jobs with those saved at :attr:`path`, eg when taking over from another instance."""
+        with self._cond:
+            for _, _, job in self._heap:
+                if job.persist:
+                    job.cancelled = True
+            self._restored = True
+
+        self._restore()
+        with self._cond:
+            self._cond.notify()
+        self.start()
+
+    def _save(self):
+        if not self._bot.active:
+            # The active instance owns the file; a standby's copy of the schedule may be out of date.
+            return
+
+        with self._save_lock:
+            jobs = [job.as_dict() for job in self._persistent_jobs()]
+            tmp_path = '%s.tmp' % self.path
+            with open(tmp_path, 'w') as f:
+                json.dump(jobs, f)
+            os.rename(tmp_path, self.path)
+
+    def _restore(self):
+        if self.path is None or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path) as f:
+                jobs = json.load(f)
+
+            restored = []
+            for data in jobs:
+                func = _resolve(data['func'])
+                if func is None:
+                    log.warning("dropping persisted job for missing function %s", data['func'])
+                    continue
+                restored.append(Job(self, data['when'], func, data['args'], data['channel'],
+                                    data['interval'], True, data.get('key')))
+        except (ValueError, KeyError, TypeError) as e:
+            log.warning("ignoring unreadable schedule at %s: %s", self.path, e)
+            return
+
+        with self._cond:
+            # Jobs added before restoring replace restored ones with the same key.
+            keys = set(job.key for _, _, job in self._heap if job.key is not None and not job.cancelled)
+            for job in restored:
+                if job.key is None or job.key not in keys:
+                    heapq.heappush(self._heap, (job.when, next(self._seq), job))
+
+        log.info("restored %s scheduled jobs from %s", len(restored), self.path)
@@ -0,0 +1,61 @@
+"""
+A local cache of workspace metadata, so a restarting bot can skip rtm.start.
+
+The snapshot is a compact json file: the bot's identity, plus the directory's
+users, channels and IMs as rows rather than full Slack objects.
+"""
+
+import json
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+KINDS = ('users', 'channels', 'ims')
+
+
+def save_snapshot(path, bot):
+    """Write the bot's identity and loaded directory kinds to path, atomically.
+
+    :param bot: a connected Bot.
+    """
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'self': {'id': bot.id, 'name': bot.name},
+    }
+    for kind in KINDS:
+        rows = bot.directory.rows(kind)
+        if rows is not None:
+            data[kind] = rows
+
+    tmp_path = '%s.tmp' % path
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.rename(tmp_path, path)
+
+
+def load_snapshot(path):
+    """Return the snapshot stored at path, or None if there isn't a usable one."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except IOError:
+        return None
+    except ValueError:
+        log.warning("ignoring corrupt snapshot at %s", path)
+        return None
+
+    if data.get('version') != SNAPSHOT_VERSION:
+        log.info("ignoring snapshot with version %r at %s", data.get('version'), path)
+        return None
+
+    return data
+
+
+def apply_snapshot(snapshot, bot):
+    """Seed the bot's directory from a loaded snapshot."""
+    for kind in KINDS:
+        if kind in snapshot:
+            bot.directory.seed(kind, snapshot[kind], rows=True)
@@ -0,0 +1,76 @@
+import bisect
+import threading
+
+# Histogram bucket upper bounds, in seconds. The last bucket catches everything slower.
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Timing(object):
+    """Count, total, max and a bucketed histogram of durations recorded under one name."""
+
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.mean,
+            'max': self.max,
+            'histogram': list(zip(BUCKETS + (float('inf'),), self.buckets)),
+        }
+
+
+class Stats(object):
+    """Named :class:`Timing` and counter values collected by a Bot.
+
+    Names are dotted, eg ``command.start`` or ``middleware.Audit.pre_dispatch``.
+    """
+
+    def __init__(self):
+        self._timings = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        """Record a duration under `name`."""
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = Timing()
+            timing.record(seconds)
+
+    def incr(self, name, amount=1):
+        """Add `amount` to the counter `name`."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def timing(self, name):
+        """Return the :class:`Timing` for `name`, or None if nothing was recorded."""
+        return self._timings.get(name)
+
+    def counter(self, name):
+        return self._counters.get(name, 0)
+
+    def snapshot(self):
+        """Return a dict of plain values, suitable for logging or serializing."""
+        with self._lock:
+            timings = dict((name, timing.as_dict()) for name, timing in self._timings.items())
+            counters = dict(self._counters)
+        return {'timings': timings, 'counters': counters}
@@ -1,8 +1,13 @@
+import io
 import json
+import time
 from unittest import TestCase
+from wsgiref.util import setup_testing_defaults
 
 from mock import Mock, patch, create_autospec
 
+from .events_api import request_signature
+
 
 class CommandTestCase(TestCase):
     """A TestCase for unit testing bot requests and responses.
@@ -30,8 +35,12 @@ class CommandTestCase(TestCase):
         self.slack_patcher = patch.object(self.bot, 'slack', autospec=True)
         self.slack_mock = self.slack_patcher.start()
 
+        self.api_patcher = patch.object(self.bot, 'api', autospec=True)
+        self.api_mock = self.api_patcher.start()
+
     def tearDown(self):
         self.slack_patcher.stop()
+        self.api_patcher.stop()
 
     def send_message(self, command, message_delimiter=':', **event):
         """Return the bot's response to a given command.
@@ -56,3 +65,56 @@ class CommandTestCase(TestCase):
 
         args, _ = self.bot._handle_command_response.call_args
         return args[0]
+
+
+class EventsApiClient(object):
+    """Post signed requests to an :class:`EventsApp` in-process, the way Slack would.
+
+    For example::
+
+        client = EventsApiClient(bot.events_app('secret'), 'secret')
+        status, body = client.post_event({'type': 'message', 'channel': 'C1', 'text': 'mybot: help'})
+    """
+
+    def __init__(self, app, signing_secret):
+        """
+        :param app: a WSGI app, usually from :func:`Bot.events_app`.
+        :param signing_secret: the secret used to sign requests.
+        """
+        self.app = app
+        self.signing_secret = signing_secret
+
+    def post(self, payload, timestamp=None, signature=None):
+        """Post a json payload and return ``(status, body)``.
+
+        :param payload: a json-serializable dict.
+        :param timestamp: overrides the request timestamp (defaults to now).
+        :param signature: overrides the computed signature.
+        """
+        body = json.dumps(payload).encode('utf-8')
+        if timestamp is None:
+            timestamp = int(time.time())
+        if signature is None:
+            signature = request_signature(self.signing_secret, timestamp, body)
+
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'HTTP_X_SLACK_REQUEST_TIMESTAMP': str(timestamp),
+            'HTTP_X_SLACK_SIGNATURE': signature,
+            'wsgi.input': io.BytesIO(body),
+        }
+        setup_testing_defaults(environ)
+
+        status = []
+
+        def start_response(status_line, headers):
+            status.append(int(status_line.split(' ', 1)[0]))
+
+        response_body = b''.join(self.app(environ, start_response))
+        return status[0], response_body.decode('utf-8')
+
+    def post_event(self, event, **kwargs):
+        """Post an ``event_callback`` wrapping `event`; see :func:`post`."""
+        return self.post({'type': 'event_callback', 'event': event}, **kwargs)
@@ -0,0 +1,177 @@
+import json
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.exceptions import NewConnectionError
+from slacker import Error, Response
+
+from .workers import WorkerPool
+
+log = logging.getLogger(__name__)
+
+API_BASE_URL = 'https://slack.com/api/'
+
+# Statuses worth retrying: rate limiting and server errors.
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+# Method actions that only read, so repeating them is harmless, eg users.list or rtm.connect.
+IDEMPOTENT_ACTIONS = ('list', 'info', 'history', 'replies', 'members', 'get', 'lookup', 'test',
+                      'connect', 'start')
+
+
+def _is_idempotent(method):
+    return method.rpartition('.')[2].startswith(IDEMPOTENT_ACTIONS)
+
+
+def _before_request_sent(error):
+    """Return True if a ConnectionError happened before the request reached Slack."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class WebApi(object):
+    """
+    A `Slack Web API <https://api.slack.com/web>`__ client with a keep-alive connection pool.
+
+    Calls are retried with exponential backoff (honoring ``Retry-After``) on rate limiting
+    and on failures to connect. Methods that only read (see :data:`IDEMPOTENT_ACTIONS`)
+    are also retried on server errors and dropped connections; others aren't,
+    since Slack may already have acted on them, eg by posting a message.
+    Calls can be made concurrently with :func:`call_async` or :func:`call_many`.
+    Latency per method is recorded in `stats` as ``api.<method>``.
+
+    Results are `slacker <https://github.com/os/slacker>`__ Responses, the same as :attr:`Bot.slack` returns,
+    and errors reported by Slack raise ``slacker.Error``.
+    """
+
+    def __init__(self, token, stats, base_url=API_BASE_URL, pool_size=10, concurrency=4,
+                 max_retries=3, backoff=0.5, timeout=10):
+        """
+        :param token: a Slack api token.
+        :param stats: the :class:`~slouch.stats.Stats` to record into.
+        :param base_url: the url methods are relative to.
+        :param pool_size: the most connections to keep open.
+        :param concurrency: the number of threads serving :func:`call_async`.
+        :param max_retries: how many times to retry a failed call.
+        :param backoff: seconds to wait before the first retry; doubled for each one after.
+        :param timeout: seconds to wait for each response.
+        """
+        self.token = token
+        self.stats = stats
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        #: the underlying ``requests.Session``.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._workers = WorkerPool(concurrency, name='slouch-api')
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._max_in_flight = 0
+
+    def call(self, method, **params):
+        """Call a Web API method and return its Response.
+
+        :param method: the method name, eg ``chat.postMessage``.
+        :param params: the method's arguments. Lists and dicts (eg attachments) are json-encoded.
+        """
+        data = {'token': self.token}
+        for key, value in params.items():
+            if value is None:
+                continue
+            if isinstance(value, (list, dict)):
+                value = json.dumps(value)
+            data[key] = value
+
+        with self._lock:
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+
+        start = time.time()
+        try:
+            response = self._post(method, data)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self.stats.record('api.%s' % method, time.time() - start)
+
+        result = Response(response.text)
+        if not result.successful:
+            raise Error(result.error)
+        return result
+
+    def _post(self, method, data):
+        idempotent = _is_idempotent(method)
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(self.base_url + method, data=data, timeout=self.timeout)
+            except requests.ConnectionError as e:
+                if attempt >= self.max_retries or not (idempotent or _before_request_sent(e)):
+                    raise
+                delay = self.backoff * 2 ** attempt
+                log.warning("%s calling %s; retrying in %ss", e, method, delay)
+            else:
+                retryable = response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUSES)
+                if not retryable or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response
+
+                delay = self.backoff * 2 ** attempt
+                retry_after = response.headers.get('Retry-After')
+                if retry_after is not None:
+                    try:
+                        delay = max(delay, float(retry_after))
+                    except ValueError:
+                        pass
+                log.warning("%s from %s; retrying in %ss", response.status_code, method, delay)
+
+            self.stats.incr('api.retries')
+            attempt += 1
+            time.sleep(delay)
+
+    def call_async(self, method, **params):
+        """Start a call on a worker thread and return a :class:`~slouch.workers.Task` for its Response."""
+        return self._workers.submit(self.call, method, **params)
+
+    def call_many(self, calls, timeout=None):
+        """Make several calls concurrently and return their Responses in order.
+
+        The first error raised by any call is raised after all of them finish.
+
+        :param calls: an iterable of ``(method, params)`` pairs.
+        :param timeout: seconds to wait for each call.
+        """
+        tasks = [self.call_async(method, **params) for method, params in calls]
+
+        results = []
+        error = None
+        for task in tasks:
+            try:
+                results.append(task.result(timeout))
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return results
+
+    def pool_stats(self):
+        """Return a dict describing connection pool usage."""
+        with self._lock:
+            return {
+                'pool_size': self.pool_size,
+                'in_flight': self._in_flight,
+                'max_in_flight': self._max_in_flight,
+                'queued': self._workers.pending(),
+            }
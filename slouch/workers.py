@@ -0,0 +1,109 @@
+import logging
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+log = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Task(object):
+    """The pending result of a function submitted to a :class:`WorkerPool`."""
+
+    __slots__ = ('_done', '_result', '_exception')
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._exception = None
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """Block until the task finishes, then return its result or raise its exception.
+
+        :param timeout: seconds to wait before raising RuntimeError.
+        """
+        if not self._done.wait(timeout):
+            raise RuntimeError("task did not finish within %s seconds" % timeout)
+
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+
+class WorkerPool(object):
+    """A fixed number of daemon threads that run submitted functions in order of submission.
+
+    Threads are started on the first :func:`submit`.
+    """
+
+    def __init__(self, size, name='slouch-worker'):
+        """
+        :param size: the number of worker threads.
+        :param name: a prefix for the worker threads' names.
+        """
+        self.size = size
+        self.name = name
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+
+            for i in range(self.size):
+                thread = threading.Thread(target=self._work, name='%s-%s' % (self.name, i))
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            task, func, args, kwargs = item
+            try:
+                task._result = func(*args, **kwargs)
+            except Exception as e:
+                task._exception = e
+                log.debug("%s in worker task %r", e, func, exc_info=True)
+            finally:
+                task._done.set()
+
+    def submit(self, func, *args, **kwargs):
+        """Run ``func(*args, **kwargs)`` on a worker thread.
+
+        :returns: a :class:`Task`.
+        """
+        if not self._threads:
+            self._start()
+
+        task = Task()
+        self._queue.put((task, func, args, kwargs))
+        return task
+
+    def pending(self):
+        """Return the approximate number of submitted tasks that have not started."""
+        return self._queue.qsize()
+
+    def stop(self, wait=True):
+        """Stop the workers after they finish what has already been submitted."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+
+        for _ in threads:
+            self._queue.put(_STOP)
+
+        if wait:
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,169 @@
+import itertools
+import logging
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+log = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class RtmWriter(object):
+    """
+    Owns sending on an RTM websocket from a single thread.
+
+    Frames are queued by :func:`send` from any thread and written in batches
+    by the writer thread, so a slow socket never blocks command handling.
+    Slack acknowledges most frames with a ``reply_to`` message; pass those to
+    :func:`ack` to record per-type latency in `stats` (``rtm.ack.<type>``)
+    and to report failed deliveries.
+    """
+
+    #: the most frames written per wakeup of the writer thread.
+    batch_size = 50
+
+    #: seconds :func:`stop` waits for the writer thread, eg if it's blocked on a dead socket.
+    stop_timeout = 5
+
+    def __init__(self, ws, codec, stats, on_failure=None):
+        """
+        :param ws: the websocket to write to.
+        :param codec: the :class:`~slouch.codec.JsonCodec` to encode frames with.
+        :param stats: the :class:`~slouch.stats.Stats` to record into.
+        :param on_failure: called with ``(frame, error)`` for each frame that
+          could not be written or that Slack rejected.
+        """
+        self.ws = ws
+        self.codec = codec
+        self.stats = stats
+        self.on_failure = on_failure
+
+        # next() on a count is atomic, so ids are unique without a lock.
+        self._ids = itertools.count(1)
+        self._queue = queue.Queue()
+        self._pending = {}
+        self._thread = None
+        self._stopped = False
+        # Set if stop() gave up waiting for the thread, which then writes nothing more.
+        self._abandoned = False
+        self._stop_lock = threading.Lock()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='slouch-rtm-writer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer thread and fail everything unsent or unacknowledged.
+
+        Frames sent after this are failed immediately.
+        """
+        with self._stop_lock:
+            self._stopped = True
+            self._queue.put(_STOP)
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(self.stop_timeout)
+            if self._thread.is_alive():
+                log.warning("rtm writer did not stop within %ss", self.stop_timeout)
+                self._abandoned = True
+
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                self._fail(item[0], 'connection closed before sending')
+        if self._abandoned:
+            # Still stuck in a write; make sure it exits rather than waiting on the queue forever.
+            self._queue.put(_STOP)
+
+        for message_id in list(self._pending):
+            pending = self._pending.pop(message_id, None)
+            if pending is not None:
+                self._fail(pending[0], 'connection closed before acknowledgment')
+
+    def send(self, frame, expect_reply=True):
+        """Queue a frame for sending and return the id assigned to it.
+
+        :param frame: a dict with at least a ``type``. Its ``id`` is set here.
+        :param expect_reply: False for frames Slack doesn't acknowledge, eg ``typing``,
+          so they aren't left pending.
+        """
+        frame['id'] = next(self._ids)
+        with self._stop_lock:
+            stopped = self._stopped
+            if not stopped:
+                self._queue.put((frame, time.time(), expect_reply))
+        if stopped:
+            self._fail(frame, 'connection closed before sending')
+        return frame['id']
+
+    def ack(self, reply):
+        """Handle Slack's reply to a sent frame.
+
+        :param reply: an event with a ``reply_to`` field.
+        :returns: seconds from writing the frame to its acknowledgment,
+          or None if the frame isn't pending.
+        """
+        pending = self._pending.pop(reply['reply_to'], None)
+        if pending is None:
+            return None
+
+        frame, sent_at = pending
+        latency = time.time() - sent_at
+        self.stats.record('rtm.ack.%s' % frame['type'], latency)
+
+        if reply.get('ok') is False:
+            error = reply.get('error')
+            self._fail(frame, error.get('msg', error) if isinstance(error, dict) else error)
+
+        return latency
+
+    def pending(self):
+        """Return the number of frames sent but not yet acknowledged."""
+        return len(self._pending)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for i, item in enumerate(batch):
+                if item is _STOP or self._abandoned:
+                    # Fail the rest of the batch; stop() fails anything still queued.
+                    for rest in batch[i:]:
+                        if rest is not _STOP:
+                            self._fail(rest[0], 'connection closed before sending')
+                    return
+                self._write(*item)
+
+    def _write(self, frame, queued_at, expect_reply=True):
+        # Acks are timed from the write so queueing delay doesn't count as round trip.
+        sent_at = time.time()
+        if expect_reply:
+            self._pending[frame['id']] = (frame, sent_at)
+        try:
+            self.ws.send(self.codec.dumps(frame))
+        except Exception as e:
+            self._pending.pop(frame['id'], None)
+            self._fail(frame, e)
+        else:
+            self.stats.record('rtm.write', time.time() - queued_at)
+
+    def _fail(self, frame, error):
+        self.stats.incr('rtm.send.failed')
+        if self.on_failure is not None:
+            try:
+                self.on_failure(frame, error)
+            except Exception:
+                log.exception("error in send failure callback")
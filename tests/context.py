@@ -1,7 +1,16 @@
 import os
 import sys
+import time
 
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
 
 import slouch  # noqa
 from example import TimerBot  # noqa
+
+
+def wait_until(condition, timeout=2):
+    """Poll until condition() is true or timeout seconds pass, and return its last result."""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(.01)
+    return condition()
@@ -0,0 +1,27 @@
+from unittest import TestCase
+
+import context
+
+from slouch import codec
+
+
+class TestCodec(TestCase):
+
+    def test_stdlib_is_always_available(self):
+        self.assertEqual(codec.available_codecs()[-1].name, 'json')
+
+    def test_default_is_fastest_available(self):
+        self.assertEqual(codec.default_codec().name, codec.available_codecs()[0].name)
+        self.assertEqual(context.slouch.Bot.codec.name, codec.default_codec().name)
+
+    def test_round_trip(self):
+        frame = {'type': 'message', 'channel': 'C1', 'text': u'caf\xe9 <http://foo.com/>', 'id': 1}
+
+        for json_codec in codec.available_codecs():
+            encoded = json_codec.dumps(frame)
+            self.assertEqual(json_codec.loads(encoded), frame, json_codec)
+            self.assertEqual(json_codec.loads(encoded.encode('utf-8')), frame, json_codec)
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            codec.get_codec('pickle')
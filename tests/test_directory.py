@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from mock import Mock
+
+import context
+
+
+def _page(field, items, next_cursor=''):
+    return Mock(body={field: items, 'response_metadata': {'next_cursor': next_cursor}})
+
+
+class TestDirectory(TestCase):
+
+    def setUp(self):
+        self.bot = context.slouch.Bot('slack_token', {})
+        self.bot.id = 'UBOT'
+        self.bot.slack = Mock()
+
+    def test_users_are_paged_and_indexed(self):
+        self.bot.slack.users.get.side_effect = [
+            _page('members', [{'id': 'U1', 'name': 'alice', 'profile': {'email': 'alice@example.com'}}], 'next'),
+            _page('members', [{'id': 'U2', 'name': 'bob'}]),
+        ]
+
+        directory = self.bot.directory
+        self.assertEqual(directory.user_by_name('bob').id, 'U2')
+        self.assertEqual(directory.user_by_email('alice@example.com').name, 'alice')
+        self.assertIsNone(directory.user('U3'))
+
+        _, kwargs = self.bot.slack.users.get.call_args
+        self.assertEqual(kwargs['params']['cursor'], 'next')
+
+        # Later lookups are served from the cache.
+        directory.user('U1')
+        self.assertEqual(self.bot.slack.users.get.call_count, 2)
+
+    def test_user_change_reindexes(self):
+        self.bot.slack.users.get.return_value = _page('members', [{'id': 'U1', 'name': 'alice'}])
+        directory = self.bot.directory
+        directory.load(['users'])
+
+        directory.handle_event({'type': 'user_change', 'user': {'id': 'U1', 'name': 'alicia'}})
+
+        self.assertIsNone(directory.user_by_name('alice'))
+        self.assertEqual(directory.user_by_name('alicia').id, 'U1')
+
+    def test_channel_events(self):
+        self.bot.slack.channels.get.return_value = _page('channels', [])
+        directory = self.bot.directory
+        directory.load(['channels'])
+
+        directory.handle_event({'type': 'channel_created', 'channel': {'id': 'C1', 'name': 'general'}})
+        self.assertFalse(directory.channel_by_name('#general').is_member)
+
+        directory.handle_event({'type': 'member_joined_channel', 'user': 'UBOT', 'channel': 'C1'})
+        self.assertTrue(directory.channel('C1').is_member)
+
+    def test_events_before_load_are_ignored(self):
+        self.bot.directory.handle_event({'type': 'user_change', 'user': {'id': 'U1', 'name': 'alice'}})
+        self.assertFalse(self.bot.slack.users.get.called)
+
+    def test_events_during_reload_are_kept(self):
+        self.bot.slack.users.get.return_value = _page('members', [{'id': 'U1', 'name': 'alice'}])
+        directory = self.bot.directory
+        directory.load(['users'])
+
+        def fetch(method, params):
+            # The event arrives while the (now stale) page is being fetched.
+            directory.handle_event({'type': 'user_change', 'user': {'id': 'U1', 'name': 'alicia'}})
+            return _page('members', [{'id': 'U1', 'name': 'alice'}])
+
+        self.bot.slack.users.get.side_effect = fetch
+        directory.load(['users'])
+
+        self.assertEqual(directory.user('U1').name, 'alicia')
@@ -0,0 +1,99 @@
+import json
+from unittest import TestCase
+
+from mock import Mock
+
+import context
+
+from slouch.codec import get_codec
+from slouch.event import Event
+
+
+class TestEvent(TestCase):
+
+    fields = {
+        'type': 'message',
+        'channel': 'C1',
+        'user': 'U1',
+        'text': 'timerbot: start',
+        'ts': '1355517523.000005',
+        'team': 'T1',
+    }
+
+    def decode(self, fields):
+        return Event.decode(json.dumps(fields), get_codec('json'))
+
+    def test_hot_fields_are_attributes(self):
+        event = self.decode(self.fields)
+        self.assertEqual((event.type, event.channel, event.user), ('message', 'C1', 'U1'))
+        self.assertEqual(event['text'], 'timerbot: start')
+
+    def test_decode_parses_once(self):
+        codec = get_codec('json')
+        loads = Mock(side_effect=codec.loads)
+        event = Event.decode(json.dumps(self.fields), Mock(loads=loads))
+
+        self.assertEqual((event['team'], event.get('thread_ts', 'none')), ('T1', 'none'))
+        self.assertEqual(loads.call_count, 1)
+        self.assertEqual(event._extra, {'team': 'T1'})
+
+    def raw_event(self):
+        raw = json.dumps(self.fields)
+        return Event(json.loads(raw), raw, get_codec('json'))
+
+    def test_raw_held_event_decodes_cold_fields_lazily(self):
+        event = self.raw_event()
+        self.assertIsNone(event._extra)
+        self.assertEqual(event.user, 'U1')
+
+        self.assertEqual(event['team'], 'T1')
+        self.assertIsNone(event._raw)
+        self.assertEqual(event.get('thread_ts', 'none'), 'none')
+
+    def test_cold_decode_race(self):
+        event = self.raw_event()
+        # As left by another thread that decoded after this one saw _extra unset.
+        raw, event._raw = event._raw, None
+        event._extra = {'team': 'T1'}
+        self.assertEqual(event._cold(), {'team': 'T1'})
+
+    def test_missing_hot_field(self):
+        event = self.decode({'type': 'hello'})
+        self.assertIsNone(event.text)
+        self.assertNotIn('text', event)
+        with self.assertRaises(KeyError):
+            event['text']
+
+        event['text'] = 'hi'
+        self.assertIn('text', event)
+
+    def test_dict_compatibility(self):
+        event = self.decode(self.fields)
+        self.assertEqual(dict(event), self.fields)
+        self.assertEqual(event, self.fields)
+        self.assertEqual(Event(self.fields), event)
+
+        self.assertEqual(sorted(event.items()), sorted(self.fields.items()))
+        self.assertEqual(sorted(event.values()), sorted(self.fields.values()))
+        self.assertEqual(len(event), 6)
+
+        copied = event.copy()
+        copied['user'] = 'U2'
+        self.assertEqual(event['user'], 'U1')
+
+        event['thread_ts'] = '1'
+        del event['user']
+        self.assertEqual(sorted(event), ['channel', 'team', 'text', 'thread_ts', 'ts', 'type'])
+
+
+class TestEventDispatch(context.slouch.testing.CommandTestCase):
+
+    bot_class = context.TimerBot
+    config = {'start_fmt': '{:%Y}', 'stop_fmt': '{.days}'}
+
+    def test_commands_receive_events(self):
+        self.send_message('help', user='U1', channel='C1')
+
+        _, event = self.bot._handle_command_response.call_args[0]
+        self.assertIsInstance(event, Event)
+        self.assertEqual(event['user'], 'U1')
@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from mock import Mock
+
+import context
+
+
+class TestEventsApi(TestCase):
+
+    def setUp(self):
+        self.bot = context.TimerBot('slack_token', {'start_fmt': 'started', 'stop_fmt': '{.days}'})
+        self.bot.slack = Mock()
+        self.bot.api = Mock()
+        self.bot._set_identity('UBOT', 'timerbot')
+
+        self.app = self.bot.events_app('secret', workers=1)
+        self.client = context.slouch.testing.EventsApiClient(self.app, 'secret')
+
+    def tearDown(self):
+        self.app.pool.stop()
+
+    def test_url_verification(self):
+        status, body = self.client.post({'type': 'url_verification', 'challenge': 'abc'})
+        self.assertEqual((status, body), (200, 'abc'))
+
+    def test_bad_signature_is_rejected(self):
+        status, _ = self.client.post_event({'type': 'message'}, signature='v0=bogus')
+        self.assertEqual(status, 401)
+        self.assertEqual(self.app.pool.pending(), 0)
+
+    def test_stale_timestamp_is_rejected(self):
+        status, _ = self.client.post_event({'type': 'message'}, timestamp=1)
+        self.assertEqual(status, 401)
+
+    def test_event_is_dispatched_and_answered_via_api(self):
+        status, _ = self.client.post_event({'type': 'message', 'channel': 'C1', 'text': 'timerbot: start'})
+        self.assertEqual(status, 200)
+
+        self.app.pool.stop()
+
+        self.bot.api.call.assert_called_once_with(
+            'chat.postMessage', channel='C1', text='started', as_user=True)
@@ -44,6 +44,6 @@ class TestExample(context.slouch.testing.CommandTestCase):
     def test_notify(self):
         res = self.send_message('start')
 
-        self.bot.slack.users.list().body = {'members': [{'name': 'user', 'id': 'U123'}]}
+        self.bot.slack.users.get.return_value.body = {'members': [{'name': 'user', 'id': 'U123'}]}
         res = self.send_message('stop --notify=user')
         self.assertTrue(res.startswith('<@U123>'), res)
@@ -0,0 +1,96 @@
+import sys
+import threading
+from unittest import TestCase
+
+from mock import Mock, patch
+
+import context
+
+from slouch.keepalive import Keepalive
+from slouch.stats import Stats
+
+
+class TestKeepalive(TestCase):
+
+    def setUp(self):
+        self.writer = Mock()
+        self.writer.send.side_effect = self.sent
+        self.pings = []
+        self.dead = threading.Event()
+        self.reasons = []
+
+    def sent(self, frame):
+        self.pings.append(frame)
+        return len(self.pings)
+
+    def on_dead(self, reason):
+        self.reasons.append(reason)
+        self.dead.set()
+
+    def keepalive(self, **kwargs):
+        keepalive = Keepalive(self.writer, Stats(), self.on_dead, interval=.01, timeout=.05, **kwargs)
+        self.addCleanup(keepalive.stop)
+        return keepalive
+
+    def test_missing_pong_is_dead(self):
+        self.keepalive().start()
+
+        self.assertTrue(self.dead.wait(2))
+        self.assertEqual(self.pings, [{'type': 'ping'}])
+        self.assertIn('no pong', self.reasons[0])
+
+    def answer_pings(self, keepalive, rtt):
+        def answer(frame):
+            ping_id = self.sent(frame)
+            threading.Timer(0, keepalive.pong, ({'type': 'pong', 'reply_to': ping_id}, rtt)).start()
+            return ping_id
+        self.writer.send.side_effect = answer
+
+    def test_degraded_rtt_is_dead(self):
+        keepalive = self.keepalive(max_rtt=.5, degraded_pings=2)
+        self.answer_pings(keepalive, 1)
+        keepalive.start()
+
+        self.assertTrue(self.dead.wait(2))
+        self.assertIn('slower than', self.reasons[0])
+        self.assertEqual(len(self.pings), 2)
+        self.assertEqual(keepalive.last_rtt, 1)
+
+    def test_healthy_connection(self):
+        keepalive = self.keepalive()
+        self.answer_pings(keepalive, .001)
+        keepalive.start()
+
+        self.assertFalse(self.dead.wait(.3))
+        self.assertGreater(len(self.pings), 1)
+
+
+class TestBotPongs(context.slouch.testing.CommandTestCase):
+
+    bot_class = context.TimerBot
+    config = {'start_fmt': '{:%Y}', 'stop_fmt': '{.days}'}
+
+    def test_pongs_reach_keepalive(self):
+        self.bot._writer = Mock()
+        self.bot._writer.ack.return_value = .25
+        self.bot._keepalive = Mock()
+
+        self.bot._on_message(self.ws, '{"type": "pong", "reply_to": 3}')
+
+        event, rtt = self.bot._keepalive.pong.call_args[0]
+        self.assertEqual((event['reply_to'], rtt), (3, .25))
+
+    def test_reconnects_do_not_recurse(self):
+        self.slack_mock.rtm.start.return_value.body = {
+            'url': 'wss://example', 'self': {'id': 'UBOT', 'name': 'timerbot'}, 'channels': []}
+        reconnects = sys.getrecursionlimit() + 10
+
+        def close():
+            if ws_app.return_value.run_forever.call_count < reconnects:
+                self.bot._on_close(self.bot.ws, None, None)
+
+        with patch('websocket.WebSocketApp') as ws_app:
+            ws_app.return_value.run_forever.side_effect = close
+            self.bot.run_forever()
+
+        self.assertEqual(self.slack_mock.rtm.start.call_count, reconnects)
@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from mock import Mock, patch
+
+import context
+
+from slouch.lease import FileLease, Lease
+
+
+def report(bot):
+    return None
+
+
+class TestFileLease(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'bot.lease')
+
+    def test_only_one_holder(self):
+        first, second = FileLease(self.path), FileLease(self.path)
+        self.addCleanup(first.release)
+        self.addCleanup(second.release)
+
+        self.assertTrue(first.acquire())
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+
+        first.release()
+        self.assertTrue(second.acquire())
+        self.assertFalse(first.acquire())
+
+
+class TestStandby(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'bot.lease')
+
+    def start_bot(self, lease, schedule_path=None):
+        bot = context.TimerBot('slack_token', {'start_fmt': 'started', 'stop_fmt': '{.days}'})
+        bot.lease_interval = .02
+        bot.schedule_path = schedule_path
+        bot.scheduler = context.slouch.Scheduler(bot, schedule_path)
+        bot.slack = Mock()
+        bot.slack.rtm.start.return_value.body = {
+            'url': 'wss://example',
+            'self': {'id': 'UBOT', 'name': 'timerbot'},
+            'channels': [],
+        }
+        bot._handle_command_response = Mock()
+        self.addCleanup(bot.release_lease)
+
+        with patch('websocket.WebSocketApp'):
+            bot.run_forever(lease=lease)
+        return bot
+
+    def send_command(self, bot):
+        bot._on_message(Mock(), '{"type": "message", "channel": "C1", "text": "timerbot: start"}')
+
+    def test_standby_takes_over_when_lease_lapses(self):
+        active = self.start_bot(FileLease(self.path))
+        self.assertTrue(context.wait_until(lambda: active.active))
+
+        standby = self.start_bot(FileLease(self.path))
+        time.sleep(.1)
+        self.assertFalse(standby.active)
+
+        self.send_command(standby)
+        self.assertFalse(standby._handle_command_response.called)
+        self.send_command(active)
+        self.assertTrue(active._handle_command_response.called)
+
+        active.release_lease()
+        self.assertFalse(active.active)
+        self.assertTrue(context.wait_until(lambda: standby.active, timeout=1))
+        self.assertEqual(standby.stats.counter('lease.acquired'), 1)
+
+        self.send_command(standby)
+        self.assertTrue(standby._handle_command_response.called)
+
+    def test_lost_renewal_goes_passive(self):
+        lease = Mock(spec=Lease)
+        lease.acquire.return_value = True
+        bot = self.start_bot(lease)
+        self.assertTrue(context.wait_until(lambda: bot.active))
+
+        lease.acquire.side_effect = IOError('store unavailable')
+        self.assertTrue(context.wait_until(lambda: not bot.active))
+        self.assertEqual(bot.stats.counter('lease.lost'), 1)
+
+    def test_standby_does_not_run_scheduled_jobs(self):
+        bot = self.start_bot(Mock(spec=Lease, **{'acquire.return_value': False}))
+        job = Mock(return_value='report')
+        bot.schedule_at(time.time(), job, channel='C1')
+
+        time.sleep(.1)
+        self.assertFalse(job.called)
+
+    def test_only_the_active_instance_saves_the_schedule(self):
+        schedule_path = os.path.join(self.tmpdir, 'schedule.json')
+        active = self.start_bot(FileLease(self.path), schedule_path)
+        self.assertTrue(context.wait_until(lambda: active.active))
+        standby = self.start_bot(FileLease(self.path), schedule_path)
+
+        later = time.time() + 7200
+        active.schedule_at(later, report, persist=True)
+        standby.schedule_at(time.time() + 3600, report, persist=True)
+        standby.schedule_at(time.time(), report, persist=True)
+        time.sleep(.1)
+
+        with open(schedule_path) as f:
+            self.assertEqual([job['when'] for job in json.load(f)], [later])
+
+        active.release_lease()
+        self.assertTrue(context.wait_until(lambda: standby.active))
+        self.assertEqual([job.when for job in standby.scheduler._persistent_jobs()], [later])
+
+    def test_incomplete_lease_fails_on_construction(self):
+        class AcquireOnly(Lease):
+            def acquire(self):
+                return True
+
+        with self.assertRaises(TypeError):
+            AcquireOnly()
@@ -0,0 +1,79 @@
+import logging
+from unittest import TestCase
+
+from mock import Mock, patch
+
+import context
+
+from slouch.logs import LazyFormat, Record, log_record
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestLogs(TestCase):
+
+    def setUp(self):
+        self.log = logging.getLogger('slouch.test_logs')
+        self.handler = ListHandler()
+        self.log.addHandler(self.handler)
+        self.log.propagate = False
+        self.addCleanup(self.log.removeHandler, self.handler)
+
+    def test_nothing_is_formatted_when_disabled(self):
+        self.log.setLevel(logging.INFO)
+        formatter = Mock(return_value='')
+
+        self.log.debug('%s', LazyFormat(formatter, 'arg'))
+        log_record(self.log, logging.DEBUG, 'command', size=1)
+
+        self.assertFalse(formatter.called)
+        self.assertEqual(self.handler.records, [])
+
+    def test_structured_record(self):
+        self.log.setLevel(logging.DEBUG)
+        log_record(self.log, logging.DEBUG, 'command', command='start', duration=0.5, size=4)
+
+        record, = self.handler.records
+        self.assertEqual(record.getMessage(), 'command command=start duration=0.500000 size=4')
+        self.assertEqual(record.slouch, {'event': 'command', 'command': 'start', 'duration': 0.5, 'size': 4})
+
+    def test_sampling(self):
+        self.log.setLevel(logging.DEBUG)
+        with patch('random.random', return_value=.5):
+            log_record(self.log, logging.DEBUG, 'dropped', sample_rate=.25)
+            log_record(self.log, logging.DEBUG, 'kept', sample_rate=.75)
+
+        self.assertEqual([r.getMessage() for r in self.handler.records], ['kept'])
+
+    def test_record_str(self):
+        self.assertEqual(str(Record('split_response', {'parts': 3, 'size': 8550})),
+                         'split_response parts=3 size=8550')
+
+
+class TestBotLogging(context.slouch.testing.CommandTestCase):
+
+    bot_class = context.TimerBot
+    config = {'start_fmt': '{:%Y}', 'stop_fmt': '{.days}'}
+
+    def test_command_record(self):
+        handler = ListHandler()
+        log = logging.getLogger('slouch')
+        log.addHandler(handler)
+        self.addCleanup(log.removeHandler, handler)
+        old_level = log.level
+        log.setLevel(logging.DEBUG)
+        self.addCleanup(log.setLevel, old_level)
+
+        self.send_message('start', channel='C1')
+
+        fields = [r.slouch for r in handler.records if getattr(r, 'slouch', {}).get('event') == 'command']
+        self.assertEqual(len(fields), 1)
+        self.assertEqual((fields[0]['command'], fields[0]['channel']), ('start', 'C1'))
+        self.assertIsNotNone(fields[0]['duration'])
@@ -0,0 +1,70 @@
+import context
+
+
+class MiddlewareBot(context.slouch.Bot):
+    pass
+
+
+@MiddlewareBot.command
+def echo(opts, bot, event):
+    """Usage: echo <text>"""
+    return opts['<text>']
+
+
+@MiddlewareBot.command
+def fail(opts, bot, event):
+    """Usage: fail"""
+    raise ValueError('boom')
+
+
+@MiddlewareBot.middleware
+class Auth(object):
+    def pre_parse(self, bot, event):
+        return event.get('user') != 'banned'
+
+    def pre_dispatch(self, bot, event, cmd, rest):
+        if cmd == 'echo' and rest == 'secret':
+            return 'not allowed'
+
+
+@MiddlewareBot.middleware
+class Shout(object):
+    name = 'shout'
+
+    def post_response(self, bot, event, res):
+        return res.upper()
+
+    def on_error(self, bot, event, exc):
+        return 'error: %s' % exc
+
+
+class TestMiddleware(context.slouch.testing.CommandTestCase):
+
+    bot_class = MiddlewareBot
+
+    def test_post_response(self):
+        self.assertEqual(self.send_message('echo hi'), 'HI')
+
+    def test_pre_dispatch_short_circuits(self):
+        self.assertEqual(self.send_message('echo secret'), 'NOT ALLOWED')
+        self.assertIsNone(self.bot.stats.timing('command.echo'))
+
+    def test_pre_parse_drops_event(self):
+        self.send_message('echo first')
+        self.bot._handle_command_response.reset_mock()
+
+        self.bot._on_message(self.ws, '{"type": "message", "user": "banned", "text": "%s:echo hi"}' % self.bot.name)
+        self.assertFalse(self.bot._handle_command_response.called)
+
+    def test_on_error(self):
+        self.assertEqual(self.send_message('fail'), 'ERROR: BOOM')
+
+    def test_hooks_are_timed(self):
+        self.send_message('echo hi')
+
+        self.assertEqual(self.bot.stats.timing('middleware.Auth.pre_parse').count, 1)
+        self.assertEqual(self.bot.stats.timing('middleware.shout.post_response').count, 1)
+        self.assertEqual(self.bot.stats.timing('command.echo').count, 1)
+
+    def test_registry_is_per_class(self):
+        self.assertEqual(context.TimerBot.middlewares, [])
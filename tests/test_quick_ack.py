@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+
+from mock import Mock
+
+import context
+
+release = threading.Event()
+calls = []
+
+
+class SlowBot(context.TimerBot):
+    ack_after = .05
+
+
+@SlowBot.command
+def slow(opts, bot, event):
+    """Usage: slow"""
+    calls.append(event['user'])
+    release.wait(2)
+    return 'done'
+
+
+class TestQuickAck(context.slouch.testing.CommandTestCase):
+
+    bot_class = SlowBot
+    config = {'start_fmt': '{:%Y}', 'stop_fmt': '{.days}'}
+
+    def setUp(self):
+        super(TestQuickAck, self).setUp()
+        release.clear()
+        del calls[:]
+        self.bot._writer = Mock()
+        self.threads = []
+
+    def tearDown(self):
+        release.set()
+        for thread in self.threads:
+            thread.join()
+        super(TestQuickAck, self).tearDown()
+
+    def send_in_background(self, user='U1', **event):
+        event.update({'type': 'message', 'channel': 'C1', 'user': user, 'text': '%s: slow' % self.bot.name})
+        thread = threading.Thread(target=self.bot._on_message, args=(self.ws, json.dumps(event)))
+        thread.start()
+        self.threads.append(thread)
+
+    def test_slow_command_sends_typing(self):
+        self.send_in_background()
+        context.wait_until(lambda: self.bot._writer.send.called)
+
+        self.bot._writer.send.assert_called_once_with({'type': 'typing', 'channel': 'C1'}, expect_reply=False)
+
+    def test_ack_text_replaces_typing(self):
+        self.bot.ack_text = 'working on it...'
+        self.send_in_background()
+        context.wait_until(lambda: self.bot._handle_command_response.called)
+
+        args, _ = self.bot._handle_command_response.call_args
+        self.assertEqual(args[0], 'working on it...')
+        self.assertFalse(self.bot._writer.send.called)
+
+    def test_fast_command_is_not_acknowledged(self):
+        release.set()
+        self.send_message('slow')
+        time.sleep(.1)
+
+        self.assertFalse(self.bot._writer.send.called)
+
+    def test_duplicates_in_flight_are_collapsed(self):
+        self.send_in_background()
+        context.wait_until(lambda: calls)
+
+        self.send_in_background()
+        self.send_in_background(user='U2')
+        context.wait_until(lambda: len(calls) == 2)
+        release.set()
+        for thread in self.threads:
+            thread.join()
+
+        self.assertEqual(sorted(calls), ['U1', 'U2'])
+        self.assertEqual(self.bot.stats.counter('command.duplicate'), 1)
+
+    def test_duplicate_queued_behind_the_first_is_collapsed(self):
+        release.set()
+        # Slack's clock is well behind ours; only Slack's is used to compare.
+        sent_at = time.time() - 1000
+        self.send_message('slow', user='U1', ts='%.6f' % sent_at)
+        self.send_message('slow', user='U1', ts='%.6f' % sent_at)
+        self.assertEqual(calls, ['U1'])
+
+        self.send_message('slow', user='U1', ts='%.6f' % (sent_at + 1))
+        self.assertEqual(calls, ['U1', 'U1'])
+
+    def test_finished_requests_are_forgotten(self):
+        release.set()
+        self.bot.request_memory = 0
+        sent_at = time.time()
+        self.send_message('slow', user='U1', ts='%.6f' % sent_at)
+        time.sleep(.01)
+        self.send_message('slow', user='U1', ts='%.6f' % sent_at)
+
+        self.assertEqual(calls, ['U1', 'U1'])
+        self.assertEqual(len(self.bot._finished), 1)
@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from mock import Mock
+
+import context
+
+ran = threading.Event()
+
+
+def report(bot, text):
+    ran.set()
+    return text
+
+
+class TestScheduler(context.slouch.testing.CommandTestCase):
+
+    bot_class = context.TimerBot
+    config = {'start_fmt': '{:%Y}', 'stop_fmt': '{.days}'}
+
+    def setUp(self):
+        super(TestScheduler, self).setUp()
+        ran.clear()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super(TestScheduler, self).tearDown()
+        shutil.rmtree(self.tmpdir)
+
+    def wait_for_response(self):
+        context.wait_until(lambda: self.bot._handle_command_response.called)
+        args, _ = self.bot._handle_command_response.call_args
+        return args
+
+    def test_schedule_at_sends_response(self):
+        self.bot.schedule_at(time.time(), report, args=('done',), channel='C1')
+
+        self.assertEqual(self.wait_for_response(), ('done', {'channel': 'C1'}))
+
+    def test_cancelled_job_does_not_run(self):
+        job = self.bot.schedule_at(time.time() + .05, report, args=('done',))
+        job.cancel()
+        time.sleep(.1)
+
+        self.assertFalse(ran.is_set())
+        self.assertEqual(self.bot.scheduler.pending(), 0)
+
+    def test_every_reschedules(self):
+        func = Mock(return_value=None)
+        job = self.bot.every(.01, func, start=time.time())
+
+        context.wait_until(lambda: func.call_count >= 3)
+        job.cancel()
+
+        self.assertGreaterEqual(func.call_count, 3)
+
+    def test_persisted_jobs_are_restored(self):
+        path = os.path.join(self.tmpdir, 'schedule.json')
+        scheduler = context.slouch.Scheduler(self.bot, path)
+        scheduler.add(time.time() + 3600, report, args=('later',), channel='C1', persist=True)
+
+        with open(path) as f:
+            self.assertEqual(json.load(f)[0]['func'], '%s:report' % __name__)
+
+        restored = context.slouch.Scheduler(self.bot, path)
+        restored.start()
+        self.assertEqual(restored.pending(), 1)
+
+    def test_keyed_job_replaces_restored_copy(self):
+        path = os.path.join(self.tmpdir, 'schedule.json')
+        for restart in range(3):
+            scheduler = context.slouch.Scheduler(self.bot, path)
+            scheduler.add(time.time() + 3600, report, args=('daily',), interval=3600, persist=True, key='daily')
+            self.assertEqual(scheduler.pending(), 1)
+
+        restored = context.slouch.Scheduler(self.bot, path)
+        restored.start()
+        self.assertEqual(restored.pending(), 1)
+
+    def test_unreadable_schedule_is_ignored(self):
+        path = os.path.join(self.tmpdir, 'schedule.json')
+        with open(path, 'w') as f:
+            f.write('{')
+
+        scheduler = context.slouch.Scheduler(self.bot, path)
+        scheduler.add(time.time(), report, args=('done',), channel='C1')
+
+        self.assertEqual(self.wait_for_response(), ('done', {'channel': 'C1'}))
+
+    def test_unpersistable_func_is_rejected(self):
+        scheduler = context.slouch.Scheduler(self.bot, os.path.join(self.tmpdir, 'schedule.json'))
+        with self.assertRaises(ValueError):
+            scheduler.add(time.time(), lambda bot: None, persist=True)
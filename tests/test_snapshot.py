@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from mock import Mock, call, patch
+
+import context
+
+from slouch.snapshot import load_snapshot, save_snapshot
+
+
+class TestSnapshot(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'workspace.json')
+
+        self.bot = self.make_bot()
+        self.bot._set_identity('UBOT', 'timerbot')
+        self.bot.directory.seed('users', [{'id': 'U1', 'name': 'alice', 'profile': {'email': 'a@example.com'}}])
+        self.bot.directory.seed('channels', [{'id': 'C1', 'name': 'general', 'is_member': True}])
+
+    def make_bot(self):
+        bot = context.TimerBot('slack_token', {'start_fmt': '{:%Y}', 'stop_fmt': '{.days}'})
+        bot.snapshot_path = self.path
+        bot.slack = Mock()
+        return bot
+
+    def test_round_trip(self):
+        save_snapshot(self.path, self.bot)
+
+        bot = self.make_bot()
+        with patch.object(bot, '_refresh_snapshot') as refresh:
+            bot.prepare_events()
+
+        self.assertFalse(bot.slack.auth.test.called)
+        refresh.assert_called_once_with(reconcile=True)
+        self.assertEqual((bot.id, bot.name), ('UBOT', 'timerbot'))
+        self.assertEqual(bot.directory.user_by_email('a@example.com').id, 'U1')
+        self.assertTrue(bot.directory.channel_by_name('general').is_member)
+        self.assertIsNone(bot.directory.rows('ims'))
+
+    def test_warm_start_uses_rtm_connect(self):
+        save_snapshot(self.path, self.bot)
+
+        bot = self.make_bot()
+        bot.slack.rtm.get.return_value.body = {'url': 'wss://example', 'self': {'id': 'UBOT', 'name': 'timerbot'}}
+        with patch.object(bot, '_refresh_snapshot') as refresh, patch('websocket.WebSocketApp'):
+            bot.run_forever()
+
+        bot.slack.rtm.get.assert_called_once_with('rtm.connect')
+        self.assertFalse(bot.slack.rtm.start.called)
+        refresh.assert_called_once_with(reconcile=True)
+        self.assertEqual(bot.directory.user('U1').name, 'alice')
+
+    def test_reconnect_keeps_live_directory(self):
+        save_snapshot(self.path, self.bot)
+
+        bot = self.make_bot()
+        bot.slack.rtm.get.return_value.body = {'url': 'wss://example', 'self': {'id': 'UBOT', 'name': 'timerbot'}}
+        def disconnect_once():
+            if ws_app.return_value.run_forever.call_count == 1:
+                bot.directory.handle_event({'type': 'user_change', 'user': {'id': 'U1', 'name': 'alicia'}})
+                bot._on_close(bot.ws, None, None)
+
+        with patch.object(bot, '_refresh_snapshot') as refresh, patch('websocket.WebSocketApp') as ws_app:
+            ws_app.return_value.run_forever.side_effect = disconnect_once
+            bot.run_forever()
+
+        self.assertEqual(bot.slack.rtm.get.call_count, 2)
+        self.assertFalse(bot.slack.rtm.start.called)
+        self.assertEqual(refresh.call_args_list, [call(reconcile=True)] * 2)
+        self.assertEqual(bot.directory.user('U1').name, 'alicia')
+
+    def test_cold_start_seeds_directory_from_rtm_start(self):
+        bot = self.make_bot()
+        bot.slack.rtm.start.return_value.body = {
+            'url': 'wss://example',
+            'self': {'id': 'UBOT', 'name': 'timerbot'},
+            'users': [{'id': 'U2', 'name': 'bob'}],
+            'channels': [],
+        }
+        with patch.object(bot, '_refresh_snapshot') as refresh, patch('websocket.WebSocketApp'):
+            bot.run_forever()
+
+        refresh.assert_called_once_with(reconcile=False)
+        self.assertEqual(bot.directory.user_by_name('bob').id, 'U2')
+        self.assertFalse(bot.slack.users.get.called)
+
+    def test_unusable_snapshots_are_ignored(self):
+        self.assertIsNone(load_snapshot(self.path))
+
+        with open(self.path, 'w') as f:
+            f.write('{"version": 0}')
+        self.assertIsNone(load_snapshot(self.path))
+
+        with open(self.path, 'w') as f:
+            f.write('{')
+        self.assertIsNone(load_snapshot(self.path))
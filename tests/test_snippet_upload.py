@@ -0,0 +1,79 @@
+import context
+
+
+class SnippetBot(context.TimerBot):
+    snippet_threshold = 5000
+
+
+@SnippetBot.command
+def dump(opts, bot, event):
+    """Usage: dump <lines>"""
+    return '\n'.join('line %s' % i for i in range(int(opts['<lines>'])))
+
+
+@SnippetBot.command
+def dump_api(opts, bot, event):
+    """Usage: dump_api"""
+    return {'channel': 'C2', 'text': 'x' * 6000}
+
+
+@SnippetBot.command
+def dump_thread(opts, bot, event):
+    """Usage: dump_thread"""
+    return {'text': 'x' * 6000, 'thread_ts': '1.5'}
+
+
+@SnippetBot.command
+def dump_attachments(opts, bot, event):
+    """Usage: dump_attachments"""
+    return {'channel': 'C2', 'text': 'x' * 6000, 'attachments': [{'text': 'keep me'}]}
+
+
+class TestSnippetUpload(context.slouch.testing.CommandTestCase):
+
+    bot_class = SnippetBot
+    config = {'start_fmt': '{:%Y}', 'stop_fmt': '{.days}'}
+
+    def test_short_responses_are_sent_normally(self):
+        self.assertEqual(self.send_message('dump 2'), 'line 0\nline 1')
+        self.assertFalse(self.slack_mock.files.post.called)
+
+    def test_long_response_is_uploaded_once(self):
+        self.bot._on_message(self.ws, '{"type": "message", "channel": "C1", "text": "%s:dump 1000"}' % self.bot.name)
+
+        self.assertFalse(self.bot._handle_command_response.called)
+        self.slack_mock.files.post.assert_called_once()
+
+        api, = self.slack_mock.files.post.call_args[0]
+        data = self.slack_mock.files.post.call_args[1]['data']
+        self.assertEqual(api, 'files.upload')
+        self.assertEqual(data['channels'], 'C1')
+        self.assertEqual(len(data['content']), 8889)
+        self.assertTrue(data['initial_comment'].startswith('line 0\n_(1000 lines'), data['initial_comment'])
+
+    def test_long_api_response_uses_its_channel(self):
+        self.bot._on_message(self.ws, '{"type": "message", "channel": "C1", "text": "%s:dump_api"}' % self.bot.name)
+
+        self.assertEqual(self.slack_mock.files.post.call_args[1]['data']['channels'], 'C2')
+
+    def test_long_threaded_response_stays_in_thread(self):
+        self.bot._on_message(self.ws, '{"type": "message", "channel": "C1", "text": "%s:dump_thread"}' % self.bot.name)
+
+        data = self.slack_mock.files.post.call_args[1]['data']
+        self.assertEqual((data['channels'], data['thread_ts']), ('C1', '1.5'))
+
+    def test_response_with_other_fields_is_not_uploaded(self):
+        self.bot._on_message(self.ws, '{"type": "message", "channel": "C1", "text": "%s:dump_attachments"}' % self.bot.name)
+
+        self.assertFalse(self.slack_mock.files.post.called)
+        sent = [args[0] for args, _ in self.bot._handle_command_response.call_args_list]
+        self.assertTrue(any(r.get('attachments') for r in sent), sent)
+
+    def test_failed_upload_falls_back_to_messages(self):
+        self.slack_mock.files.post.side_effect = Exception('missing_scope')
+        self.bot._on_message(self.ws, '{"type": "message", "channel": "C1", "text": "%s:dump 1000"}' % self.bot.name)
+
+        sent = [args[0] for args, _ in self.bot._handle_command_response.call_args_list]
+        self.assertGreater(len(sent), 1)
+        self.assertTrue(sent[0].startswith('line 0\n'))
+        self.assertTrue(sent[-1].endswith('line 999'))
@@ -0,0 +1,126 @@
+import json
+import threading
+from unittest import TestCase
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+try:
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from SocketServer import ThreadingMixIn
+
+try:
+    from urllib.parse import parse_qs
+except ImportError:
+    from urlparse import parse_qs
+
+import requests
+from slacker import Error
+
+import context
+
+from slouch.stats import Stats
+from slouch.webapi import WebApi
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeSlack(BaseHTTPRequestHandler):
+    """Answers every method with its arguments, after any queued failure statuses."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        server.client_ports.add(self.client_address[1])
+
+        length = int(self.headers['Content-Length'])
+        params = dict((k, v[0]) for k, v in parse_qs(self.rfile.read(length).decode('utf-8')).items())
+
+        with server.lock:
+            status = server.failures.pop(0) if server.failures else 200
+
+        if status == 200:
+            ok = params.get('fail') is None
+            body = json.dumps({'ok': ok, 'error': None if ok else 'invalid_auth', 'params': params})
+        else:
+            body = ''
+
+        body = body.encode('utf-8')
+        self.send_response(status)
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestWebApi(TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSlack)
+        self.server.client_ports = set()
+        self.server.failures = []
+        self.server.lock = threading.Lock()
+
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.stats = Stats()
+        self.api = WebApi('token', self.stats, base_url='http://127.0.0.1:%s/' % self.server.server_port,
+                          backoff=0)
+
+    def test_call(self):
+        res = self.api.call('chat.postMessage', channel='C1', attachments=[{'text': 'hi'}], thread_ts=None)
+
+        self.assertEqual(res.body['params'], {
+            'token': 'token', 'channel': 'C1', 'attachments': '[{"text": "hi"}]'})
+        self.assertEqual(self.stats.timing('api.chat.postMessage').count, 1)
+
+    def test_connections_are_reused(self):
+        for _ in range(3):
+            self.api.call('api.test')
+
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_retries(self):
+        self.server.failures = [429, 503]
+
+        self.assertTrue(self.api.call('api.test').successful)
+        self.assertEqual(self.stats.counter('api.retries'), 2)
+
+    def test_writes_are_not_retried_on_server_errors(self):
+        self.server.failures = [429, 503]
+
+        with self.assertRaises(requests.HTTPError):
+            self.api.call('chat.postMessage', channel='C1', text='hi')
+        self.assertEqual(self.stats.counter('api.retries'), 1)
+
+    def test_failures_to_connect_are_retried(self):
+        self.api.base_url = 'http://127.0.0.1:1/'
+
+        with self.assertRaises(requests.ConnectionError):
+            self.api.call('chat.postMessage', channel='C1', text='hi')
+        self.assertEqual(self.stats.counter('api.retries'), 3)
+
+    def test_slack_errors_raise(self):
+        with self.assertRaises(Error):
+            self.api.call('api.test', fail=1)
+
+    def test_call_many(self):
+        results = self.api.call_many([('users.info', {'user': 'U%s' % i}) for i in range(6)])
+
+        self.assertEqual([r.body['params']['user'] for r in results], ['U%s' % i for i in range(6)])
+        self.assertGreaterEqual(self.api.pool_stats()['max_in_flight'], 1)
+        self.assertEqual(self.api.pool_stats()['in_flight'], 0)
@@ -0,0 +1,116 @@
+import json
+import time
+from unittest import TestCase
+
+from mock import Mock
+
+import context
+
+from slouch.codec import get_codec
+from slouch.stats import Stats
+from slouch.writer import RtmWriter
+
+
+class TestRtmWriter(TestCase):
+
+    def setUp(self):
+        self.ws = Mock()
+        self.stats = Stats()
+        self.on_failure = Mock()
+        self.writer = RtmWriter(self.ws, get_codec('json'), self.stats, self.on_failure)
+
+    def sent_frames(self):
+        return [json.loads(args[0]) for args, _ in self.ws.send.call_args_list]
+
+    def test_ids_are_assigned_and_acks_recorded(self):
+        first = self.writer.send({'type': 'message', 'channel': 'C1', 'text': 'a'})
+        second = self.writer.send({'type': 'message', 'channel': 'C1', 'text': 'b'})
+        self.writer.start()
+
+        context.wait_until(lambda: self.ws.send.call_count >= 2)
+
+        self.assertEqual([f['id'] for f in self.sent_frames()], [first, second])
+        self.assertEqual(self.writer.pending(), 2)
+
+        self.writer.ack({'ok': True, 'reply_to': first})
+        self.writer.ack({'ok': False, 'reply_to': second, 'error': {'code': 2, 'msg': 'message text is missing'}})
+
+        self.assertEqual(self.stats.timing('rtm.ack.message').count, 2)
+        self.on_failure.assert_called_once_with(self.sent_frames()[1], 'message text is missing')
+        self.assertEqual(self.stats.counter('rtm.send.failed'), 1)
+
+    def test_ack_latency_excludes_queueing(self):
+        frame_id = self.writer.send({'type': 'ping'})
+        time.sleep(.2)
+        self.writer._write(*self.writer._queue.get_nowait())
+
+        latency = self.writer.ack({'ok': True, 'reply_to': frame_id})
+        self.assertLess(latency, .1)
+        self.assertGreaterEqual(self.stats.timing('rtm.write').max, .2)
+
+    def test_unacknowledged_frames_are_not_pending(self):
+        self.writer.send({'type': 'typing', 'channel': 'C1'}, expect_reply=False)
+        self.writer._write(*self.writer._queue.get_nowait())
+
+        self.assertEqual(self.sent_frames()[0]['type'], 'typing')
+        self.assertEqual(self.writer.pending(), 0)
+
+    def test_socket_errors_are_reported(self):
+        error = IOError('broken pipe')
+        self.ws.send.side_effect = error
+        self.writer.send({'type': 'message', 'channel': 'C1', 'text': 'a'})
+        self.writer.start()
+        self.writer.stop()
+
+        frame, reported = self.on_failure.call_args[0]
+        self.assertEqual((frame['text'], reported), ('a', error))
+        self.assertEqual(self.writer.pending(), 0)
+
+    def test_stop_fails_unsent_frames(self):
+        self.writer.send({'type': 'message', 'channel': 'C1', 'text': 'a'})
+        self.writer.stop()
+
+        self.assertFalse(self.ws.send.called)
+        self.assertEqual(self.on_failure.call_count, 1)
+
+    def test_send_after_stop_fails_immediately(self):
+        self.writer.start()
+        self.writer.stop()
+        self.writer.send({'type': 'message', 'channel': 'C1', 'text': 'late'})
+
+        self.assertFalse(self.ws.send.called)
+        frame, reported = self.on_failure.call_args[0]
+        self.assertEqual((frame['text'], reported), ('late', 'connection closed before sending'))
+
+    def test_stop_gives_up_on_a_stuck_thread(self):
+        self.ws.send.side_effect = lambda data: time.sleep(.3)
+        self.writer.stop_timeout = .05
+        self.writer.send({'type': 'message', 'channel': 'C1', 'text': 'a'})
+        self.writer.send({'type': 'message', 'channel': 'C1', 'text': 'b'})
+        self.writer.start()
+
+        context.wait_until(lambda: self.ws.send.called)
+
+        start = time.time()
+        self.writer.stop()
+        self.assertLess(time.time() - start, .25)
+
+        # Once unstuck, the thread exits without writing the rest of its batch.
+        self.writer._thread.join(2)
+        self.assertFalse(self.writer._thread.is_alive())
+        self.assertEqual(self.ws.send.call_count, 1)
+        failed = sorted(args[0]['text'] for args, _ in self.on_failure.call_args_list)
+        self.assertEqual(failed, ['a', 'b'])
+
+
+class TestBotAcks(context.slouch.testing.CommandTestCase):
+
+    bot_class = context.TimerBot
+    config = {'start_fmt': '{:%Y}', 'stop_fmt': '{.days}'}
+
+    def test_replies_are_routed_to_writer(self):
+        self.bot._writer = Mock()
+        self.bot._on_message(self.ws, '{"ok": true, "reply_to": 1, "ts": "1.0"}')
+
+        self.assertEqual(self.bot._writer.ack.call_args[0][0]['reply_to'], 1)
+        self.assertFalse(self.bot._handle_command_response.called)